@@ -0,0 +1,256 @@
+import datetime
+import sqlite3
+import threading
+
+# Arquivo SQLite local do quiosque (diário de registros ainda não gravados no banco)
+ARQUIVO_ARMAZEM = 'refeitorio_local.db'
+# Tentativas de gravação de um registro antes de ele ser separado como rejeitado
+MAX_TENTATIVAS = 5
+
+
+class ArmazemLocal:
+    """Armazenamento local do quiosque, que permite operar com o MariaDB fora do ar.
+
+    Guarda o diário durável dos registros de entrada/saída ainda não gravados
+    no banco. Cada registro é anexado (commit em disco, synchronous=FULL)
+    antes de o aluno ser liberado, e só sai do diário depois de confirmado
+    pelo banco. Registros que o banco recusa repetidamente vão para a tabela
+    `rejeitados`, para conferência manual, sem travar a fila. Os descartados
+    por conflito com outros quiosques vão para `conflitos`. Cada registro tem
+    um uid, que torna idempotente a regravação após uma queda, e a marca
+    `offline` dos registros feitos com o banco fora do ar (os únicos sujeitos
+    às regras de conflito de db_utils.gravar_registros). A foto pode chegar
+    depois do registro (anexar_foto): enquanto ela é codificada, o registro
+    e os seguintes esperam no diário.
+
+    Também guarda uma cópia do cadastro de alunos e das entradas abertas, de
+    onde o quiosque parte quando inicia sem acesso ao banco.
+    """
+
+    def __init__(self, arquivo=ARQUIVO_ARMAZEM):
+        self.arquivo = arquivo
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(arquivo, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=FULL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS diario (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                uid TEXT NOT NULL UNIQUE,
+                aluno_id INTEGER NOT NULL,
+                tipo TEXT NOT NULL,
+                momento TEXT NOT NULL,
+                foto BLOB,
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                ultimo_erro TEXT
+            );
+            CREATE TABLE IF NOT EXISTS rejeitados (
+                seq INTEGER PRIMARY KEY,
+                uid TEXT NOT NULL,
+                aluno_id INTEGER NOT NULL,
+                tipo TEXT NOT NULL,
+                momento TEXT NOT NULL,
+                foto BLOB,
+                erro TEXT,
+                rejeitado_em TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE TABLE IF NOT EXISTS conflitos (
+                seq INTEGER PRIMARY KEY,
+                uid TEXT NOT NULL,
+                aluno_id INTEGER NOT NULL,
+                tipo TEXT NOT NULL,
+                momento TEXT NOT NULL,
+                motivo TEXT NOT NULL,
+                descartado_em TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE TABLE IF NOT EXISTS alunos (
+                id INTEGER PRIMARY KEY,
+                nome TEXT NOT NULL,
+                matricula TEXT NOT NULL,
+                data_nascimento TEXT,
+                curso TEXT,
+                atualizado_em TEXT
+            );
+            CREATE TABLE IF NOT EXISTS entradas_abertas (
+                aluno_id INTEGER PRIMARY KEY
+            );
+        """)
+        # Arquivos criados por versões anteriores
+        self._adicionar_coluna('diario', 'offline', 'INTEGER NOT NULL DEFAULT 0')
+        self._adicionar_coluna('diario', 'aguardando_foto', 'INTEGER NOT NULL DEFAULT 0')
+        # Fotos que não chegaram antes de o processo terminar: o registro vale sem elas
+        sem_foto = self._conn.execute('UPDATE diario SET aguardando_foto = 0 WHERE aguardando_foto = 1').rowcount
+        if sem_foto:
+            print(f'{sem_foto} registro(s) do diário ficaram sem foto (processo encerrado durante a codificação)')
+
+    def _adicionar_coluna(self, tabela, coluna, definicao):
+        colunas = {linha[1] for linha in self._conn.execute(f'PRAGMA table_info({tabela})')}
+        if coluna not in colunas:
+            self._conn.execute(f'ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}')
+
+    def anexar(self, uid, aluno_id, tipo, momento, foto_bytes=None, offline=False, aguardando_foto=False):
+        """Grava o registro no diário; ao retornar, ele sobrevive a uma queda do processo.
+
+        Com `aguardando_foto`, o registro só é entregue por pendentes() depois de anexar_foto().
+        """
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO diario (uid, aluno_id, tipo, momento, foto, offline, aguardando_foto) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (uid, aluno_id, tipo, momento.isoformat(sep=' '), foto_bytes, int(offline), int(aguardando_foto)))
+
+    def anexar_foto(self, uid, foto_bytes):
+        """Completa um registro anexado com `aguardando_foto` (foto_bytes None: fica sem foto)."""
+        with self._lock:
+            self._conn.execute('UPDATE diario SET foto = ?, aguardando_foto = 0 WHERE uid = ?', (foto_bytes, uid))
+
+    def pendentes(self, limite=None):
+        """Registros ainda não confirmados (dicts), na ordem em que foram feitos.
+
+        Para no primeiro registro que ainda aguarda a foto, para manter a ordem.
+        """
+        query = """
+            SELECT seq, uid, aluno_id, tipo, momento, foto, offline, tentativas FROM diario
+            WHERE seq < (SELECT COALESCE(MIN(seq), 9223372036854775807) FROM diario WHERE aguardando_foto = 1)
+            ORDER BY seq"""
+        params = ()
+        if limite is not None:
+            query += ' LIMIT ?'
+            params = (limite,)
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            columns = [desc[0] for desc in cursor.description]
+            registros = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        for registro in registros:
+            registro['momento'] = datetime.datetime.fromisoformat(registro['momento'])
+            registro['offline'] = bool(registro['offline'])
+        return registros
+
+    def movimentos_pendentes(self):
+        """(aluno_id, tipo) dos registros pendentes, em ordem, sem carregar as fotos."""
+        with self._lock:
+            return self._conn.execute('SELECT aluno_id, tipo FROM diario ORDER BY seq').fetchall()
+
+    def entradas_pendentes(self):
+        """(aluno_id, momento) das entradas ainda no diário, sem carregar as fotos."""
+        with self._lock:
+            linhas = self._conn.execute("SELECT aluno_id, momento FROM diario WHERE tipo = 'entrada'").fetchall()
+        return [(aluno_id, datetime.datetime.fromisoformat(momento)) for aluno_id, momento in linhas]
+
+    def confirmar(self, seqs):
+        """Remove do diário os registros já gravados no banco."""
+        if not seqs:
+            return
+        with self._lock:
+            self._conn.execute(f"DELETE FROM diario WHERE seq IN ({', '.join('?' * len(seqs))})", list(seqs))
+
+    def falhou(self, seq, erro):
+        """Conta uma tentativa malsucedida; após MAX_TENTATIVAS o registro é rejeitado.
+
+        Retorna True se o registro saiu do diário (foi para `rejeitados`).
+        """
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute('UPDATE diario SET tentativas = tentativas + 1, ultimo_erro = ? WHERE seq = ?',
+                                   (str(erro), seq))
+                self._conn.execute("""
+                    INSERT INTO rejeitados (seq, uid, aluno_id, tipo, momento, foto, erro)
+                    SELECT seq, uid, aluno_id, tipo, momento, foto, ultimo_erro FROM diario
+                    WHERE seq = ? AND tentativas >= ?
+                    """, (seq, MAX_TENTATIVAS))
+                rejeitado = self._conn.execute('DELETE FROM diario WHERE seq = ? AND tentativas >= ?',
+                                               (seq, MAX_TENTATIVAS)).rowcount > 0
+                self._conn.execute('COMMIT')
+                return rejeitado
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def descartar(self, seqs_motivos):
+        """Tira do diário registros descartados por conflito, guardando-os em `conflitos`."""
+        if not seqs_motivos:
+            return
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                for seq, motivo in seqs_motivos:
+                    self._conn.execute("""
+                        INSERT OR REPLACE INTO conflitos (seq, uid, aluno_id, tipo, momento, motivo)
+                        SELECT seq, uid, aluno_id, tipo, momento, ? FROM diario WHERE seq = ?
+                        """, (motivo, seq))
+                    self._conn.execute('DELETE FROM diario WHERE seq = ?', (seq,))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def salvar_alunos(self, alunos, substituir=False):
+        """Grava (ou atualiza) os alunos na cópia local; com `substituir`, apaga os demais."""
+        linhas = [(a['id'], a['nome'], a['matricula'], _texto(a.get('data_nascimento')), a.get('curso'),
+                   _texto(a.get('atualizado_em'))) for a in alunos]
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                if substituir:
+                    self._conn.execute('DELETE FROM alunos')
+                self._conn.executemany('INSERT OR REPLACE INTO alunos VALUES (?, ?, ?, ?, ?, ?)', linhas)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def carregar_alunos(self):
+        """Alunos da cópia local, no formato de db_utils.carregar_alunos()."""
+        with self._lock:
+            cursor = self._conn.execute(
+                'SELECT id, nome, matricula, data_nascimento, curso, atualizado_em FROM alunos')
+            columns = [desc[0] for desc in cursor.description]
+            alunos = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        for aluno in alunos:
+            if aluno['data_nascimento']:
+                aluno['data_nascimento'] = datetime.date.fromisoformat(aluno['data_nascimento'])
+            if aluno['atualizado_em']:
+                aluno['atualizado_em'] = datetime.datetime.fromisoformat(aluno['atualizado_em'])
+        return alunos
+
+    def salvar_entradas_abertas(self, ids):
+        """Substitui a cópia local do conjunto de entradas abertas."""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute('DELETE FROM entradas_abertas')
+                self._conn.executemany('INSERT INTO entradas_abertas VALUES (?)', [(i,) for i in ids])
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def aplicar_movimento(self, aluno_id, tipo):
+        """Atualiza a cópia local das entradas abertas com um registro deste quiosque."""
+        with self._lock:
+            if tipo == 'entrada':
+                self._conn.execute('INSERT OR IGNORE INTO entradas_abertas VALUES (?)', (aluno_id,))
+            else:
+                self._conn.execute('DELETE FROM entradas_abertas WHERE aluno_id = ?', (aluno_id,))
+
+    def carregar_entradas_abertas(self):
+        with self._lock:
+            return {row[0] for row in self._conn.execute('SELECT aluno_id FROM entradas_abertas')}
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM diario').fetchone()[0]
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _texto(valor):
+    """Datas e horários em texto ISO, como ficam guardados no SQLite."""
+    if isinstance(valor, datetime.datetime):
+        return valor.isoformat(sep=' ')
+    if isinstance(valor, datetime.date):
+        return valor.isoformat()
+    return valor
@@ -0,0 +1,230 @@
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QObject, QSize, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QImage, QPixmap
+from PyQt5.QtWidgets import QDialog, QLabel, QLineEdit, QListView, QMessageBox, QVBoxLayout
+
+from db_utils import buscar_foto, carregar_miniaturas
+from fotos import TAMANHO_FOTO, TAMANHO_MINIATURA
+
+# Linhas acrescentadas à lista a cada vez que a rolagem chega ao fim
+LINHAS_POR_CARGA = 200
+# Miniaturas buscadas no banco por consulta
+LOTE_MINIATURAS = 100
+# Espera (ms) para juntar os pedidos de miniaturas feitos durante a pintura
+ESPERA_LOTE_MS = 30
+# Miniaturas mantidas em memória (as menos vistas recentemente saem primeiro)
+MAX_MINIATURAS_CACHE = 3000
+
+
+class CarregadorMiniaturas(QObject):
+    """Busca miniaturas no banco numa thread, em lotes, fora da thread da interface.
+
+    Os pedidos feitos enquanto a lista é pintada são agrupados por um timer
+    curto e viram uma consulta por lote. As miniaturas chegam já como QImage
+    pelo sinal `carregadas`; hashes sem miniatura chegam como QImage nula,
+    para não serem pedidos de novo.
+    """
+
+    carregadas = pyqtSignal(dict)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pedidos = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='miniaturas')
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._enviar)
+
+    def pedir(self, foto_hash):
+        self._pedidos[foto_hash] = None
+        if not self._timer.isActive():
+            self._timer.start(ESPERA_LOTE_MS)
+
+    def _enviar(self):
+        while self._pedidos:
+            lote = []
+            while self._pedidos and len(lote) < LOTE_MINIATURAS:
+                lote.append(self._pedidos.popitem(last=False)[0])
+            try:
+                self._executor.submit(self._carregar, lote)
+            except RuntimeError:
+                return  # Executor já encerrado (janela fechando)
+
+    def _carregar(self, lote):
+        try:
+            miniaturas = carregar_miniaturas(lote)
+        except Exception as e:
+            print(f'Erro ao carregar miniaturas: {e}')
+            traceback.print_exc()
+            miniaturas = {}
+        imagens = {h: QImage.fromData(miniaturas[h]) if h in miniaturas else QImage() for h in lote}
+        # O sinal é entregue na thread da interface via conexão enfileirada
+        self.carregadas.emit(imagens)
+
+    def encerrar(self):
+        self._timer.stop()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ModeloAuditoria(QAbstractListModel):
+    """Registros de um dia para conferência das fotos, com miniaturas carregadas sob demanda.
+
+    A lista cresce em páginas de LINHAS_POR_CARGA conforme a rolagem
+    (canFetchMore/fetchMore), e a view só pede a miniatura das linhas que
+    pinta. Enquanto ela não chega, a linha mostra um quadro cinza. As
+    miniaturas ficam num cache LRU limitado por MAX_MINIATURAS_CACHE.
+    """
+
+    def __init__(self, carregador, parent=None):
+        super().__init__(parent)
+        self.carregador = carregador
+        self.carregador.carregadas.connect(self._receber)
+        self._registros = []
+        self._linhas_por_hash = {}
+        self._exibidos = 0
+        self._cache = OrderedDict()
+        self._pedidos = set()
+        self._vazia = QImage(*TAMANHO_MINIATURA, QImage.Format_RGB32)
+        self._vazia.fill(QColor('#dddddd'))
+
+    def definir_registros(self, registros):
+        self.beginResetModel()
+        self._registros = registros
+        self._exibidos = 0
+        self._linhas_por_hash = {}
+        for linha, registro in enumerate(registros):
+            if registro.get('foto_hash'):
+                self._linhas_por_hash.setdefault(registro['foto_hash'], []).append(linha)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._exibidos
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self._exibidos < len(self._registros)
+
+    def fetchMore(self, parent):
+        quantidade = min(LINHAS_POR_CARGA, len(self._registros) - self._exibidos)
+        if parent.isValid() or quantidade <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._exibidos, self._exibidos + quantidade - 1)
+        self._exibidos += quantidade
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self._exibidos:
+            return None
+        registro = self._registros[index.row()]
+        if role == Qt.DisplayRole:
+            hora = registro['hora_entrada'].strftime('%H:%M') if registro.get('hora_entrada') else '--:--'
+            return f"{hora} - {registro.get('turno', '')}\n{registro.get('nome', 'N/A')}\n{registro.get('matricula', '')}"
+        if role == Qt.DecorationRole:
+            return self._miniatura(registro.get('foto_hash'))
+        if role == Qt.ToolTipRole:
+            return f"{registro.get('nome', 'N/A')} ({registro.get('matricula', '')}) - {registro.get('curso', '')}"
+        if role == Qt.UserRole:
+            return registro
+        return None
+
+    def _miniatura(self, foto_hash):
+        if not foto_hash:
+            return self._vazia
+        imagem = self._cache.get(foto_hash)
+        if imagem is not None:
+            self._cache.move_to_end(foto_hash)
+            return imagem if not imagem.isNull() else self._vazia
+        if foto_hash not in self._pedidos:
+            self._pedidos.add(foto_hash)
+            self.carregador.pedir(foto_hash)
+        return self._vazia
+
+    def _receber(self, imagens):
+        for foto_hash, imagem in imagens.items():
+            self._pedidos.discard(foto_hash)
+            self._cache[foto_hash] = imagem
+            self._cache.move_to_end(foto_hash)
+            for linha in self._linhas_por_hash.get(foto_hash, ()):
+                if linha < self._exibidos:
+                    indice = self.index(linha)
+                    self.dataChanged.emit(indice, indice, [Qt.DecorationRole])
+        while len(self._cache) > MAX_MINIATURAS_CACHE:
+            self._cache.popitem(last=False)
+
+
+class JanelaAuditoriaFotos(QDialog):
+    """Grade com as fotos das entradas de um dia, para conferir quem usou cada carteirinha.
+
+    Um filtro por nome ou matrícula junta as entradas de um mesmo aluno; duplo
+    clique abre a foto em tamanho real, buscada no banco só nesse momento.
+    """
+
+    def __init__(self, registros, data, parent=None):
+        super().__init__(parent)
+        self.registros = registros
+        self.setWindowTitle(f"Auditoria de Fotos - {data.strftime('%d/%m/%Y')} ({len(registros)} entradas)")
+        self.resize(1000, 700)
+
+        self.carregador = CarregadorMiniaturas(self)
+        self.modelo = ModeloAuditoria(self.carregador, self)
+        self.modelo.definir_registros(registros)
+
+        self.filtro = QLineEdit(self)
+        self.filtro.setPlaceholderText("Filtrar por nome ou matrícula")
+        self.filtro.textChanged.connect(self.filtrar)
+
+        largura, altura = TAMANHO_MINIATURA
+        self.lista = QListView(self)
+        self.lista.setModel(self.modelo)
+        self.lista.setViewMode(QListView.IconMode)
+        self.lista.setResizeMode(QListView.Adjust)
+        self.lista.setMovement(QListView.Static)
+        self.lista.setIconSize(QSize(largura, altura))
+        self.lista.setGridSize(QSize(largura + 120, altura + 60))
+        self.lista.setUniformItemSizes(True)
+        self.lista.setWordWrap(True)
+        self.lista.setLayoutMode(QListView.Batched)
+        self.lista.setBatchSize(LINHAS_POR_CARGA)
+        self.lista.doubleClicked.connect(self.abrir_foto)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.filtro)
+        layout.addWidget(self.lista)
+
+    def filtrar(self, texto):
+        texto = texto.strip().lower()
+        if not texto:
+            self.modelo.definir_registros(self.registros)
+            return
+        self.modelo.definir_registros([
+            r for r in self.registros
+            if texto in str(r.get('nome', '')).lower() or texto in str(r.get('matricula', '')).lower()])
+
+    def abrir_foto(self, indice):
+        registro = indice.data(Qt.UserRole)
+        if not registro or not registro.get('foto_hash'):
+            QMessageBox.information(self, "Auditoria de Fotos", "Registro sem foto.")
+            return
+        try:
+            foto_bytes = buscar_foto(registro['foto_hash'])
+        except Exception as e:
+            QMessageBox.critical(self, "Erro", f"Erro ao carregar foto: {e}")
+            return
+        pixmap = QPixmap()
+        if not foto_bytes or not pixmap.loadFromData(foto_bytes):
+            QMessageBox.warning(self, "Auditoria de Fotos", "Foto não encontrada.")
+            return
+
+        janela = QDialog(self)
+        janela.setWindowTitle(f"{registro.get('nome', 'N/A')} - {registro.get('matricula', '')}")
+        foto = QLabel(janela)
+        foto.setPixmap(pixmap.scaled(TAMANHO_FOTO[0] * 2, TAMANHO_FOTO[1] * 2,
+                                     Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        QVBoxLayout(janela).addWidget(foto)
+        janela.exec_()
+
+    def done(self, resultado):
+        self.carregador.encerrar()
+        super().done(resultado)
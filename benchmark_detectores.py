@@ -0,0 +1,115 @@
+import argparse
+import os
+import time
+
+import cv2
+
+from contexto_frame import ContextoFrame
+from face_overlay import DETECTORES, criar_detector
+
+EXTENSOES_IMAGEM = ('.jpg', '.jpeg', '.png', '.bmp')
+
+def gravar_frames(pasta, quantidade=300, indice_camera=0):
+    """Grava frames da câmera na pasta, para serem usados no benchmark."""
+    os.makedirs(pasta, exist_ok=True)
+    cap = cv2.VideoCapture(indice_camera)
+    gravados = 0
+    try:
+        while gravados < quantidade:
+            ret, frame = cap.read()
+            if not ret:
+                print("Falha ao capturar frame da webcam")
+                break
+            cv2.imwrite(os.path.join(pasta, f'frame_{gravados:05d}.png'), frame)
+            gravados += 1
+    finally:
+        cap.release()
+    print(f"{gravados} frames gravados em {pasta}")
+
+def carregar_frames(pasta):
+    """Carrega os frames da pasta, na ordem em que foram gravados."""
+    arquivos = sorted(f for f in os.listdir(pasta) if f.lower().endswith(EXTENSOES_IMAGEM))
+    frames = []
+    for arquivo in arquivos:
+        frame = cv2.imread(os.path.join(pasta, arquivo))
+        if frame is not None:
+            frames.append(frame)
+    return frames
+
+def intersecao_sobre_uniao(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    intersecao = iw * ih
+    uniao = aw * ah + bw * bh - intersecao
+    return intersecao / uniao if uniao else 0.0
+
+def executar_detector(nome, frames):
+    """Roda o detector sobre todos os frames e retorna (tempo total, primeiro rosto de cada frame).
+
+    Cada execução usa contextos novos, então o tempo inclui as conversões
+    para tons de cinza que o detector pede.
+    """
+    detector = criar_detector(nome)
+    detector.reiniciar()
+    rostos = []
+    inicio = time.perf_counter()
+    for numero, frame in enumerate(frames):
+        faces = detector.detectar(ContextoFrame(numero, frame))
+        rostos.append(faces[0] if faces else None)
+    return time.perf_counter() - inicio, rostos
+
+def concordancia(rostos, referencia, iou_minimo=0.5):
+    """Fração de frames em que o detector concorda com a referência.
+
+    Concordam os frames em que nenhum dos dois achou rosto ou em que os dois
+    rostos se sobrepõem com IoU de pelo menos `iou_minimo`.
+    """
+    iguais = 0
+    for rosto, rosto_ref in zip(rostos, referencia):
+        if rosto is None and rosto_ref is None:
+            iguais += 1
+        elif rosto is not None and rosto_ref is not None and intersecao_sobre_uniao(rosto, rosto_ref) >= iou_minimo:
+            iguais += 1
+    return iguais / len(referencia) if referencia else 0.0
+
+def comparar_detectores(pasta, nomes=None, referencia='haar'):
+    frames = carregar_frames(pasta)
+    if not frames:
+        print(f"Nenhuma imagem encontrada em {pasta}")
+        return []
+
+    nomes = nomes or list(DETECTORES)
+    _, rostos_referencia = executar_detector(referencia, frames)
+
+    resultados = []
+    for nome in nomes:
+        tempo, rostos = executar_detector(nome, frames)
+        resultados.append({
+            'detector': nome,
+            'fps': len(frames) / tempo if tempo else float('inf'),
+            'frames_com_rosto': sum(1 for r in rostos if r is not None),
+            'concordancia': concordancia(rostos, rostos_referencia),
+        })
+
+    print(f"\n=== BENCHMARK DE DETECTORES ({len(frames)} frames, referência: {referencia}) ===")
+    print(f"{'Detector':<22}{'FPS':>10}{'Com rosto':>12}{'Concordância':>15}")
+    for r in sorted(resultados, key=lambda r: r['fps'], reverse=True):
+        print(f"{r['detector']:<22}{r['fps']:>10.1f}{r['frames_com_rosto']:>12}{r['concordancia']:>14.1%}")
+    return resultados
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara os detectores de rosto sobre frames gravados.")
+    parser.add_argument('pasta', help="Pasta com os frames gravados (.jpg/.png)")
+    parser.add_argument('--detectores', nargs='+', choices=list(DETECTORES),
+                        help="Detectores a comparar (padrão: todos)")
+    parser.add_argument('--referencia', default='haar', choices=list(DETECTORES),
+                        help="Detector usado como referência de concordância")
+    parser.add_argument('--gravar', type=int, metavar='N',
+                        help="Antes de comparar, grava N frames da câmera na pasta")
+    args = parser.parse_args()
+
+    if args.gravar:
+        gravar_frames(args.pasta, args.gravar)
+    comparar_detectores(args.pasta, args.detectores, args.referencia)
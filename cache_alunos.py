@@ -0,0 +1,99 @@
+import threading
+
+from db_utils import carregar_alunos, contar_alunos
+from tarefa_periodica import TarefaPeriodica
+
+# Intervalo (segundos) entre as atualizações incrementais do cadastro
+INTERVALO_ATUALIZACAO = 60
+
+
+class CacheAlunos:
+    """Cadastro de alunos em memória, indexado pelo id lido no cartão.
+
+    Carregado inteiro na inicialização e depois atualizado de forma
+    incremental pela coluna `alunos.atualizado_em`. Se a quantidade de alunos
+    no banco deixar de bater com a do cache (aluno removido), o cadastro é
+    recarregado inteiro. As consultas são atendidas só da memória: um id
+    desconhecido é rejeitado sem ida ao banco.
+
+    Com um `armazem` (ArmazemLocal), cada carga e atualização é copiada para
+    o disco, e a carga inicial sem acesso ao banco parte dessa cópia.
+    """
+
+    def __init__(self, armazem=None):
+        self.armazem = armazem
+        self._alunos = {}
+        self._marcador = None
+        self._lock = threading.Lock()
+        self._tarefa = None
+
+    def __len__(self):
+        return len(self._alunos)
+
+    def buscar(self, id_str):
+        """Retorna o dict do aluno com o id informado, ou None se não existir."""
+        try:
+            id_int = int(id_str)
+        except (TypeError, ValueError):
+            return None
+        return self._alunos.get(id_int)
+
+    def carregar(self):
+        """Carrega o cadastro inteiro do banco, substituindo o conteúdo do cache.
+
+        Sem acesso ao banco, usa a cópia local (se houver) e segue offline até
+        a próxima atualização periódica conseguir falar com o servidor. Retorna
+        False quando usou a cópia local.
+        """
+        try:
+            alunos = carregar_alunos()
+        except Exception as e:
+            if self.armazem is None:
+                raise
+            alunos = self.armazem.carregar_alunos()
+            if not alunos:
+                raise
+            print(f'Banco indisponível ({e}); usando cópia local do cadastro')
+            do_banco = False
+        else:
+            do_banco = True
+            if self.armazem is not None:
+                self.armazem.salvar_alunos(alunos, substituir=True)
+        novo = {aluno['id']: aluno for aluno in alunos}
+        with self._lock:
+            self._alunos = novo
+            self._marcador = max((a['atualizado_em'] for a in alunos), default=None)
+        print(f'Cache de alunos carregado: {len(novo)} alunos')
+        return do_banco
+
+    def atualizar(self):
+        """Aplica as alterações feitas no banco desde a última carga."""
+        if self._marcador is None:
+            self.carregar()
+            return
+
+        alterados = carregar_alunos(desde=self._marcador)
+        with self._lock:
+            # Copia antes de alterar, para que buscar() nunca veja o dict pela metade
+            novo = dict(self._alunos)
+            for aluno in alterados:
+                novo[aluno['id']] = aluno
+            self._alunos = novo
+            if alterados:
+                self._marcador = max(self._marcador, max(a['atualizado_em'] for a in alterados))
+        if alterados and self.armazem is not None:
+            self.armazem.salvar_alunos(alterados)
+
+        if contar_alunos() != len(self._alunos):
+            # Houve remoção no cadastro: o marcador não detecta, então recarrega tudo
+            self.carregar()
+
+    def iniciar_atualizacao_periodica(self, intervalo=INTERVALO_ATUALIZACAO):
+        """Atualiza o cache em segundo plano a cada `intervalo` segundos."""
+        self._tarefa = TarefaPeriodica(self.atualizar, intervalo, 'cache-alunos',
+                                       'atualizar cache de alunos').iniciar()
+
+    def parar(self):
+        """Interrompe a thread periódica e espera a execução em andamento."""
+        if self._tarefa is not None:
+            self._tarefa.parar()
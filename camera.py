@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+
+
+class CapturaCamera:
+    """Lê a câmera em uma thread dedicada e guarda só os frames mais recentes.
+
+    O loop de captura nunca espera pelo processamento: cada `cap.read()` entra
+    num buffer circular pequeno e o frame mais antigo é descartado. Os estágios
+    de processamento recebem o frame por referência, sem cópia, e por isso não
+    devem alterá-lo no lugar.
+    """
+
+    def __init__(self, indice=0, tamanho_buffer=2):
+        self.indice = indice
+        self.cap = None
+        self._buffer = deque(maxlen=tamanho_buffer)
+        self._lock = threading.Lock()
+        self._contador = 0
+        self._falhas_consecutivas = 0
+        self._rodando = False
+        self._thread = None
+
+    def iniciar(self):
+        """Abre a câmera e inicia a thread de captura."""
+        self.cap = cv2.VideoCapture(self.indice)
+        # Evita que o driver acumule frames antigos na própria fila
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self._rodando = True
+        self._thread = threading.Thread(target=self._loop_captura, name='captura-camera', daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop_captura(self):
+        while self._rodando:
+            ret, frame = self.cap.read()
+            if not ret:
+                with self._lock:
+                    self._falhas_consecutivas += 1
+                time.sleep(0.01)
+                continue
+            with self._lock:
+                self._contador += 1
+                self._falhas_consecutivas = 0
+                self._buffer.append((self._contador, frame))
+
+    def ultimo_frame(self):
+        """Retorna (numero, frame) do frame mais recente ou (None, None) se ainda não houver."""
+        with self._lock:
+            if not self._buffer:
+                return None, None
+            return self._buffer[-1]
+
+    def falhando(self, limite=30):
+        """Indica se a câmera está há `limite` leituras seguidas sem entregar frame."""
+        with self._lock:
+            return self._falhas_consecutivas >= limite
+
+    def parar(self):
+        """Encerra a thread de captura e libera a câmera."""
+        self._rodando = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
@@ -0,0 +1,44 @@
+import threading
+
+import cv2
+
+
+class ContextoFrame:
+    """Um frame capturado e os buffers derivados dele, calculados uma única vez.
+
+    É criado uma vez por frame e repassado a todos os estágios (leitura do
+    código de barras, detecção de rosto, exibição). A conversão para tons de
+    cinza e as reduções só são feitas quando algum estágio pede e ficam
+    guardadas para os demais. O frame original nunca é alterado.
+    """
+
+    def __init__(self, numero, frame):
+        self.numero = numero
+        self.frame = frame
+        self._gray = None
+        self._reduzidos = {}
+        # Estágios rodam em threads diferentes (pool de decodificação)
+        self._lock = threading.Lock()
+
+    @property
+    def shape(self):
+        return self.frame.shape
+
+    @property
+    def gray(self):
+        """Frame em tons de cinza, em resolução cheia."""
+        with self._lock:
+            if self._gray is None:
+                self._gray = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)
+            return self._gray
+
+    def gray_reduzido(self, escala):
+        """Frame em tons de cinza reduzido pela escala informada (ex.: 0.5)."""
+        if escala == 1.0:
+            return self.gray
+        gray = self.gray
+        with self._lock:
+            if escala not in self._reduzidos:
+                self._reduzidos[escala] = cv2.resize(gray, None, fx=escala, fy=escala,
+                                                     interpolation=cv2.INTER_AREA)
+            return self._reduzidos[escala]
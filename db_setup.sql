@@ -3,7 +3,8 @@ CREATE TABLE IF NOT EXISTS alunos (
     nome VARCHAR(255) NOT NULL,
     matricula VARCHAR(50) NOT NULL UNIQUE,
     data_nascimento DATE NOT NULL,
-    curso VARCHAR(100) NOT NULL
+    curso VARCHAR(100) NOT NULL,
+    atualizado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
 
 CREATE TABLE IF NOT EXISTS registros_refeitorio (
@@ -13,4 +14,6 @@ CREATE TABLE IF NOT EXISTS registros_refeitorio (
     hora_entrada DATETIME,
     hora_saida DATETIME,
     FOREIGN KEY (aluno_id) REFERENCES alunos(id)
-); 
\ No newline at end of file
+); 
+
+-- Índices, triggers e demais alterações de schema: python migracoes.py
@@ -1,43 +1,45 @@
-# Passo 1: Importar a biblioteca correta
-import mariadb 
+import mariadb
+import queue
 import sys
+import threading
+import time
 import traceback
 import datetime
-import cv2
-import numpy as np
-from io import BytesIO
-from PIL import Image
+import hashlib
+from contextlib import contextmanager
+from fotos import gerar_miniatura
+
+DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'root',
+    'password': '123',  # Altere para sua senha, se necessário
+    'database': 'controle_refeitorio',
+    # Com o servidor fora do alcance, falha logo e o quiosque segue offline
+    'connect_timeout': 5,
+    # Consulta numa conexão já aberta que para de responder (queda de rede):
+    # falha em segundos, em vez de esperar o timeout de TCP do sistema
+    'read_timeout': 10,
+    'write_timeout': 10,
+}
+# Limite das consultas nos scripts de manutenção, que podem ser longas (modo_script())
+TIMEOUT_SCRIPTS = 3600
+
+# Conexões mantidas abertas pelo pool
+TAMANHO_POOL = 4
+# Conexões ociosas há mais tempo que isso (segundos) são testadas com ping antes do uso
+INTERVALO_VALIDACAO = 30.0
 
 def conectar_db():
-    # Passo 2: Usar o objeto 'mariadb' para conectar
-    return mariadb.connect(
-        host='localhost',
-        user='root',
-        password='123',  # Sua senha
-        database='controle_refeitorio'
-    )
-
-# O restante do arquivo continua igual...
-def buscar_aluno_por_id(id_str):
-    try:
-        id_int = int(id_str)
-        print(f'Consultando aluno com ID: {id_int}')
-        conn = conectar_db()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM alunos WHERE id = ?', (id_int,))
-        row = cursor.fetchone()
-        columns = [desc[0] for desc in cursor.description]
-        aluno = dict(zip(columns, row)) if row else None
-        if aluno:
-            print('Aluno encontrado:', aluno)
-        else:
-            print('Aluno não encontrado')
-        cursor.close()
-        conn.close()
-        return aluno
-    except Exception as e:
-        print(f'Erro ao consultar aluno: {e}')
-        return None
+    """Abre uma conexão avulsa (scripts). A aplicação usa o pool via obter_conexao()."""
+    return mariadb.connect(**DB_CONFIG)
+
+def modo_script():
+    """Troca os limites de leitura/escrita do quiosque pelos dos scripts de manutenção.
+
+    Chamado no início dos scripts (migrações, reconstrução do resumo,
+    reprocessamento de fotos), antes de abrir conexões.
+    """
+    DB_CONFIG.update(read_timeout=TIMEOUT_SCRIPTS, write_timeout=TIMEOUT_SCRIPTS)
 
 def excecao_nao_tratada(exctype, value, tb):
     print("Exceção não tratada na aplicação:", exctype, value)
@@ -46,125 +48,498 @@ def excecao_nao_tratada(exctype, value, tb):
 
 sys.excepthook = excecao_nao_tratada
 
-import mariadb
-import sys
-import traceback
-import datetime
-import cv2
-import numpy as np
-from io import BytesIO
-from PIL import Image
+class ConexaoPool:
+    """Conexão mantida pelo pool, com cursores preparados reaproveitados por consulta."""
 
-def conectar_db():
-    return mariadb.connect(
-        host='localhost',
-        user='root',
-        password='123',  # Altere para sua senha, se necessário
-        database='controle_refeitorio'
-    )
-
-def aluno_com_entrada_aberta(aluno_id):
-    conn = conectar_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM registros_refeitorio WHERE aluno_id = ? AND hora_saida IS NULL', (aluno_id,))
-    row = cursor.fetchone()
-    columns = [desc[0] for desc in cursor.description]
-    registro = dict(zip(columns, row)) if row else None
-    cursor.close()
-    conn.close()
-    return registro
-
-def salvar_foto_em_bytes(foto_np):
-    # Converte imagem numpy (BGR) para JPEG em bytes
-    img_rgb = cv2.cvtColor(foto_np, cv2.COLOR_BGR2RGB)
-    pil_img = Image.fromarray(img_rgb)
-    buf = BytesIO()
-    pil_img.save(buf, format='JPEG')
-    return buf.getvalue()
-
-def registrar_entrada_ou_saida(aluno_id, foto_np):
-    agora = datetime.datetime.now()
-    foto_bytes = salvar_foto_em_bytes(foto_np) if foto_np is not None else None
-    registro_aberto = aluno_com_entrada_aberta(aluno_id)
-    conn = conectar_db()
-    cursor = conn.cursor()
-    if registro_aberto:
-        # Já tem entrada aberta, registrar saída (sem foto se não enviada)
-        if foto_bytes is not None:
-            cursor.execute('UPDATE registros_refeitorio SET hora_saida = ?, foto = ? WHERE id = ?',
-                           (agora, foto_bytes, registro_aberto['id']))
-        else:
-            cursor.execute('UPDATE registros_refeitorio SET hora_saida = ? WHERE id = ?',
-                           (agora, registro_aberto['id']))
-        conn.commit()
+    def __init__(self):
+        self.conn = None
+        self._cursores = {}
+        self.conectar()
+
+    def conectar(self):
+        self.fechar()
+        self.conn = conectar_db()
+        # Cada comando é confirmado sozinho; transações usam conn.begin() explicitamente
+        self.conn.autocommit = True
+        self.ultimo_uso = time.monotonic()
+
+    def cursor_preparado(self, sql):
+        """Retorna um cursor preparado para `sql`, criado na primeira vez e reutilizado depois."""
+        cursor = self._cursores.get(sql)
+        if cursor is None:
+            cursor = self.conn.cursor(prepared=True)
+            self._cursores[sql] = cursor
+        return cursor
+
+    def saudavel(self):
+        try:
+            self.conn.ping()
+            return True
+        except mariadb.Error:
+            return False
+
+    def fechar(self):
+        for cursor in self._cursores.values():
+            try:
+                cursor.close()
+            except mariadb.Error:
+                pass
+        self._cursores = {}
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except mariadb.Error:
+                pass
+            self.conn = None
+
+class PoolConexoes:
+    """Pool de conexões com o MariaDB, com verificação de saúde e reconexão.
+
+    Evita o handshake TCP + autenticação a cada consulta. Conexões ociosas há
+    mais de `intervalo_validacao` segundos recebem um ping antes de serem
+    entregues e são refeitas se não responderem; conexões que falham durante
+    o uso são descartadas e substituídas na próxima requisição.
+    """
+
+    def __init__(self, tamanho=TAMANHO_POOL, intervalo_validacao=INTERVALO_VALIDACAO, timeout=10.0):
+        self.intervalo_validacao = intervalo_validacao
+        self.timeout = timeout
+        self._livres = queue.LifoQueue()
+        self._vagas = threading.BoundedSemaphore(tamanho)
+
+    @contextmanager
+    def conexao(self):
+        if not self._vagas.acquire(timeout=self.timeout):
+            raise mariadb.PoolError('Nenhuma conexão disponível no pool')
+        conexao = None
+        try:
+            try:
+                conexao = self._livres.get_nowait()
+            except queue.Empty:
+                conexao = ConexaoPool()
+            else:
+                if time.monotonic() - conexao.ultimo_uso > self.intervalo_validacao and not conexao.saudavel():
+                    print('Conexão com o banco perdida, reconectando...')
+                    conexao.conectar()
+
+            yield conexao
+
+            conexao.ultimo_uso = time.monotonic()
+            self._livres.put(conexao)
+        except (mariadb.InterfaceError, mariadb.OperationalError):
+            # Conexão possivelmente quebrada: descarta em vez de devolver ao pool
+            if conexao is not None:
+                conexao.fechar()
+            raise
+        except BaseException:
+            if conexao is not None:
+                try:
+                    # Desfaz uma transação explícita interrompida antes de devolver ao pool
+                    conexao.conn.rollback()
+                    self._livres.put(conexao)
+                except mariadb.Error:
+                    conexao.fechar()
+            raise
+        finally:
+            self._vagas.release()
+
+    def fechar(self):
+        while True:
+            try:
+                self._livres.get_nowait().fechar()
+            except queue.Empty:
+                break
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def obter_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PoolConexoes()
+        return _pool
+
+@contextmanager
+def obter_conexao():
+    """Empresta uma conexão do pool (ConexaoPool) pelo tempo do bloco `with`."""
+    with obter_pool().conexao() as conexao:
+        yield conexao
+
+SQL_LISTAR_ENTRADAS_ABERTAS = 'SELECT DISTINCT aluno_id FROM registros_refeitorio WHERE hora_saida IS NULL'
+
+def carregar_alunos(desde=None):
+    """Retorna os alunos (como dicts) alterados desde `desde`, ou todos se `desde` for None."""
+    query = 'SELECT id, nome, matricula, data_nascimento, curso, atualizado_em FROM alunos'
+    params = ()
+    if desde is not None:
+        # >= para não perder alterações feitas no mesmo segundo do marcador
+        query += ' WHERE atualizado_em >= ?'
+        params = (desde,)
+    with obter_conexao() as conexao:
+        cursor = conexao.conn.cursor()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        columns = [desc[0] for desc in cursor.description]
         cursor.close()
-        conn.close()
-        return 'saida', agora
-    else:
-        # Não tem entrada aberta, registrar entrada (com foto)
-        cursor.execute('INSERT INTO registros_refeitorio (aluno_id, foto, hora_entrada) VALUES (?, ?, ?)',
-                       (aluno_id, foto_bytes, agora))
-        conn.commit()
+    return [dict(zip(columns, row)) for row in rows]
+
+def contar_alunos():
+    with obter_conexao() as conexao:
+        cursor = conexao.conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM alunos')
+        total = cursor.fetchone()[0]
         cursor.close()
-        conn.close()
-        return 'entrada', agora
+    return total
 
-def relatorio_entradas_por_turno(data_inicio=None, data_fim=None):
-    try:
-        conn = conectar_db()
-        cursor = conn.cursor()
-        
-        if data_inicio is None:
-            data_inicio = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        if data_fim is None:
-            data_fim = datetime.datetime.now().replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # Definindo os 4 turnos específicos
-        cafe_manha_inicio = datetime.time(9, 30)
-        cafe_manha_fim = datetime.time(9, 50)
-        almoco_inicio = datetime.time(11, 0)
-        almoco_fim = datetime.time(12, 50)
-        cafe_tarde_inicio = datetime.time(14, 30)
-        cafe_tarde_fim = datetime.time(14, 50)
-        janta_inicio = datetime.time(19, 30)
-        janta_fim = datetime.time(20, 40)
-        
+def verificar_conexao():
+    """Confirma que o banco responde; levanta o erro de conexão se não."""
+    with obter_conexao() as conexao:
+        conexao.conn.ping()
+
+def listar_entradas_abertas():
+    """Retorna o conjunto de ids dos alunos com entrada sem saída registrada."""
+    with obter_conexao() as conexao:
+        cursor = conexao.conn.cursor()
+        cursor.execute(SQL_LISTAR_ENTRADAS_ABERTAS)
+        ids = {row[0] for row in cursor.fetchall()}
+        cursor.close()
+    return ids
+
+# Fotos ficam em fotos_refeitorio, endereçadas pelo SHA-256 do conteúdo; os
+# registros guardam só o hash (registros_refeitorio.foto_hash)
+SQL_GRAVAR_FOTO = 'INSERT IGNORE INTO fotos_refeitorio (hash, dados, miniatura) VALUES (?, ?, ?)'
+SQL_BUSCAR_FOTO = 'SELECT dados FROM fotos_refeitorio WHERE hash = ?'
+
+def hash_foto(foto_bytes):
+    """Endereço da foto: SHA-256 em hexadecimal, igual ao SHA2(dados, 256) do MariaDB."""
+    return hashlib.sha256(foto_bytes).hexdigest()
+
+def buscar_foto(foto_hash):
+    """Bytes codificados da foto com o hash informado, ou None."""
+    with obter_conexao() as conexao:
+        cursor = conexao.cursor_preparado(SQL_BUSCAR_FOTO)
+        cursor.execute(SQL_BUSCAR_FOTO, (foto_hash,))
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+def carregar_miniaturas(hashes):
+    """Retorna {hash: miniatura em bytes} das fotos informadas.
+
+    Fotos gravadas antes das miniaturas ganham a sua aqui, na primeira vez
+    em que são pedidas, e ela fica guardada no banco para as próximas.
+    """
+    hashes = list(hashes)
+    if not hashes:
+        return {}
+    marcadores = ', '.join('?' * len(hashes))
+    with obter_conexao() as conexao:
+        cursor = conexao.conn.cursor()
+        cursor.execute(f'SELECT hash, miniatura FROM fotos_refeitorio WHERE hash IN ({marcadores})', hashes)
+        miniaturas = dict(cursor.fetchall())
+        faltando = [h for h, miniatura in miniaturas.items() if miniatura is None]
+        if faltando:
+            cursor.execute(f"SELECT hash, dados FROM fotos_refeitorio WHERE hash IN ({', '.join('?' * len(faltando))})",
+                           faltando)
+            geradas = [(gerar_miniatura(dados), h) for h, dados in cursor.fetchall()]
+            geradas = [(miniatura, h) for miniatura, h in geradas if miniatura is not None]
+            if geradas:
+                cursor.executemany('UPDATE fotos_refeitorio SET miniatura = ? WHERE hash = ?', geradas)
+            miniaturas.update({h: miniatura for miniatura, h in geradas})
+        cursor.close()
+    return {h: miniatura for h, miniatura in miniaturas.items() if miniatura is not None}
+
+# Gravação dos registros do diário local (armazem_local.py). O uid de cada
+# registro torna a regravação idempotente: entrada repetida não duplica a linha
+# e saída repetida encontra a própria marca em uid_saida.
+SQL_GRAVAR_ENTRADA = """
+    INSERT INTO registros_refeitorio (uid, aluno_id, foto_hash, hora_entrada) VALUES (?, ?, ?, ?)
+    ON DUPLICATE KEY UPDATE uid = uid
+    """
+SQL_GRAVAR_SAIDA = """
+    UPDATE registros_refeitorio SET hora_saida = ?, foto_hash = COALESCE(?, foto_hash), uid_saida = ?
+    WHERE aluno_id = ? AND hora_saida IS NULL AND hora_entrada <= ?
+    ORDER BY hora_entrada DESC LIMIT 1
+    """
+SQL_SAIDA_GRAVADA = 'SELECT 1 FROM registros_refeitorio WHERE uid_saida = ?'
+
+def _entradas_existentes(cursor, registros):
+    """(aluno_id, data, turno) das entradas já no banco para os alunos e dias das entradas offline do lote."""
+    entradas = [r for r in registros if r['tipo'] == 'entrada' and r['offline']]
+    if not entradas:
+        return set()
+    alunos = sorted({r['aluno_id'] for r in entradas})
+    datas = sorted({r['momento'].date() for r in entradas})
+    uids = [r['uid'] for r in entradas]
+    cursor.execute(f"""
+        SELECT aluno_id, data_entrada, turno FROM registros_refeitorio
+        WHERE aluno_id IN ({', '.join('?' * len(alunos))})
+          AND data_entrada IN ({', '.join('?' * len(datas))})
+          AND (uid IS NULL OR uid NOT IN ({', '.join('?' * len(uids))}))
+        """, alunos + datas + uids)
+    return {(aluno_id, data, turno) for aluno_id, data, turno in cursor.fetchall()}
+
+def _gravar_saida(cursor, registro, foto_hash):
+    """Fecha a entrada aberta do aluno. Retorna False se não havia entrada aberta."""
+    # Regravação de uma saída já aplicada: não pode fechar outra entrada aberta
+    # do aluno (e esbarrar em uk_registros_uid_saida)
+    cursor.execute(SQL_SAIDA_GRAVADA, (registro['uid'],))
+    if cursor.fetchone() is not None:
+        return True
+    cursor.execute(SQL_GRAVAR_SAIDA, (registro['momento'], foto_hash, registro['uid'],
+                                      registro['aluno_id'], registro['momento']))
+    return cursor.rowcount > 0
+
+def gravar_registros(registros):
+    """Grava um lote de registros do diário local numa única transação.
+
+    Entradas consecutivas vão num único executemany. Registros feitos com o
+    banco no ar são gravados como estão (reentrar no mesmo turno é permitido).
+    Conflitos com o que outros quiosques gravaram enquanto este estava
+    offline são resolvidos assim:
+    - entrada offline de um aluno que já tem entrada no mesmo dia e turno:
+      descartada (fora dos turnos não há esse limite);
+    - saída sem entrada aberta anterior a ela (outro quiosque já a fechou, ou
+      a entrada foi descartada): descartada, em qualquer caso, por não haver
+      o que atualizar.
+    Retorna (uid, motivo) dos registros descartados.
+    """
+    descartados = []
+    with obter_conexao() as conexao:
+        cursor = conexao.conn.cursor()
+        conexao.conn.begin()
+        # As fotos vão antes, para os registros já nascerem apontando para elas
+        hashes = {r['uid']: hash_foto(r['foto']) for r in registros if r['foto'] is not None}
+        fotos = {hashes[r['uid']]: r['foto'] for r in registros if r['uid'] in hashes}
+        if fotos:
+            cursor.executemany(SQL_GRAVAR_FOTO, [(h, dados, gerar_miniatura(dados)) for h, dados in fotos.items()])
+        ja_registradas = _entradas_existentes(cursor, registros)
+        entradas = []
+        for registro in registros:
+            foto_hash = hashes.get(registro['uid'])
+            if registro['tipo'] == 'entrada':
+                chave = (registro['aluno_id'], registro['momento'].date(), codigo_turno(registro['momento']))
+                if registro['offline'] and chave[2] != TURNO_OUTROS and chave in ja_registradas:
+                    descartados.append((registro['uid'], 'entrada duplicada no turno'))
+                    continue
+                ja_registradas.add(chave)
+                entradas.append((registro['uid'], registro['aluno_id'], foto_hash, registro['momento']))
+            else:
+                # A saída precisa enxergar as entradas anteriores do lote
+                if entradas:
+                    cursor.executemany(SQL_GRAVAR_ENTRADA, entradas)
+                    entradas = []
+                if not _gravar_saida(cursor, registro, foto_hash):
+                    descartados.append((registro['uid'], 'saida sem entrada aberta'))
+        if entradas:
+            cursor.executemany(SQL_GRAVAR_ENTRADA, entradas)
+        conexao.conn.commit()
+        cursor.close()
+    return descartados
+
+# Os 4 turnos do refeitório (início e fim, inclusivos). O código de cada turno
+# é a posição no dict (1 a 4; 5 = fora dos turnos) e é gravado na coluna gerada
+# registros_refeitorio.turno: ao mudar os horários, crie uma migração que
+# redefina a coluna (migracoes.py).
+TURNOS = {
+    'Café da Manhã': (datetime.time(9, 30), datetime.time(9, 50)),
+    'Almoço': (datetime.time(11, 0), datetime.time(12, 50)),
+    'Café da Tarde': (datetime.time(14, 30), datetime.time(14, 50)),
+    'Janta': (datetime.time(19, 30), datetime.time(20, 40)),
+}
+CODIGOS_TURNO = {turno: codigo for codigo, turno in enumerate(TURNOS, start=1)}
+TURNO_OUTROS = len(TURNOS) + 1
+# Turno das linhas de resumo que acumulam o dia inteiro (todos os turnos)
+TURNO_DIA = 0
+# resumo_turnos guarda os alunos únicos de cada combinação de turnos, como
+# máscara de bits (bit turno-1); vai de 1 até MASCARA_TODOS (todos os turnos)
+MASCARA_TODOS = (1 << TURNO_OUTROS) - 1
+
+def mascara_turnos(codigos):
+    """Máscara de resumo_turnos com os códigos de turno informados."""
+    return sum(1 << (codigo - 1) for codigo in set(codigos))
+
+def codigo_turno(momento):
+    """Código do turno de um horário, como na coluna gerada registros_refeitorio.turno."""
+    hora = momento.time().replace(microsecond=0)
+    for turno, (inicio, fim) in TURNOS.items():
+        if inicio <= hora <= fim:
+            return CODIGOS_TURNO[turno]
+    return TURNO_OUTROS
+
+def _nome_turno(coluna):
+    """Expressão SQL que traduz o código do turno em `coluna` para o nome ('Outros' fora dos turnos)."""
+    nomes = ', '.join(f"'{turno}'" for turno in [*TURNOS, 'Outros'])
+    return f"ELT({coluna}, {nomes})"
+
+def _filtro_turnos(turnos_filtro, coluna='turno'):
+    """Retorna (condição SQL, parâmetros) que restringe `coluna` aos turnos informados."""
+    codigos = [CODIGOS_TURNO[turno] for turno in turnos_filtro or [] if turno in CODIGOS_TURNO]
+    if not codigos:
+        return '', []
+    return f" AND {coluna} IN ({', '.join('?' * len(codigos))})", codigos
+
+def _como_data(valor):
+    return valor.date() if isinstance(valor, datetime.datetime) else valor
+
+def _consultar(query, params=()):
+    with obter_conexao() as conexao:
+        cursor = conexao.conn.cursor()
+        cursor.execute(query, params)
+        resultados = cursor.fetchall()
+        columns = [desc[0] for desc in cursor.description]
+        cursor.close()
+    return resultados, columns
+
+def consulta_entradas_por_turno(data_inicio, data_fim):
+    """Entradas e alunos únicos por turno, com data de entrada em [data_inicio, data_fim).
+
+    Num único dia (o relatório da interface), lê só resumo_refeicoes: uma
+    linha por turno. Em períodos maiores, os alunos únicos vêm do conjunto
+    (dia, turno, aluno) de resumo_alunos, para que um aluno que comeu no mesmo
+    turno em dias diferentes conte uma vez no período.
+    """
+    inicio, fim = _como_data(data_inicio), _como_data(data_fim)
+    if fim - inicio == datetime.timedelta(days=1):
+        query = f"""
+            SELECT 
+                {_nome_turno('turno')} as nome_turno,
+                total_entradas,
+                alunos_unicos
+            FROM resumo_refeicoes
+            WHERE data_entrada = ? AND turno <> ?
+            ORDER BY turno
+            """
+        return query, [inicio, TURNO_DIA]
+
+    query = f"""
+        SELECT 
+            {_nome_turno('t.turno')} as nome_turno,
+            t.total_entradas,
+            u.alunos_unicos
+        FROM (
+            SELECT turno, SUM(total_entradas) as total_entradas
+            FROM resumo_refeicoes
+            WHERE data_entrada >= ? AND data_entrada < ? AND turno <> ?
+            GROUP BY turno
+        ) t
+        JOIN (
+            SELECT turno, COUNT(DISTINCT aluno_id) as alunos_unicos
+            FROM resumo_alunos
+            WHERE data_entrada >= ? AND data_entrada < ? AND turno <> ?
+            GROUP BY turno
+        ) u ON u.turno = t.turno
+        ORDER BY t.turno
+        """
+    intervalo = [inicio, fim, TURNO_DIA]
+    return query, intervalo + intervalo
+
+def consulta_frequencia_por_dia(data_inicio, data_fim, turnos_filtro=None):
+    """Entradas e alunos únicos por dia, com data de entrada em [data_inicio, data_fim).
+
+    Sem filtro de turnos, é uma linha de resumo_refeicoes por dia (a linha
+    do dia inteiro). Com filtro, as entradas somam as linhas dos turnos
+    escolhidos em resumo_refeicoes, e os alunos únicos vêm da linha de
+    resumo_turnos com a combinação desses turnos: uma linha por dia e turno.
+    """
+    intervalo = [_como_data(data_inicio), _como_data(data_fim)]
+    filtro, turno_params = _filtro_turnos(turnos_filtro)
+    if not filtro:
         query = """
+            SELECT 
+                data_entrada as data,
+                total_entradas,
+                alunos_unicos
+            FROM resumo_refeicoes 
+            WHERE data_entrada >= ? AND data_entrada < ? AND turno = ?
+            ORDER BY data_entrada
+            """
+        return query, intervalo + [TURNO_DIA]
+
+    query = f"""
         SELECT 
-            CASE 
-                WHEN TIME(hora_entrada) BETWEEN ? AND ? THEN 'Café da Manhã'
-                WHEN TIME(hora_entrada) BETWEEN ? AND ? THEN 'Almoço'
-                WHEN TIME(hora_entrada) BETWEEN ? AND ? THEN 'Café da Tarde'
-                WHEN TIME(hora_entrada) BETWEEN ? AND ? THEN 'Janta'
-                ELSE 'Outros'
-            END as turno,
-            COUNT(*) as total_entradas,
-            COUNT(DISTINCT aluno_id) as alunos_unicos
+            t.data_entrada as data,
+            t.total_entradas,
+            resumo_turnos.alunos_unicos
+        FROM (
+            SELECT data_entrada, SUM(total_entradas) as total_entradas
+            FROM resumo_refeicoes
+            WHERE data_entrada >= ? AND data_entrada < ?{filtro}
+            GROUP BY data_entrada
+        ) t
+        JOIN resumo_turnos
+            ON resumo_turnos.data_entrada = t.data_entrada AND resumo_turnos.mascara = ?
+        ORDER BY t.data_entrada
+        """
+    return query, intervalo + turno_params + [mascara_turnos(turno_params)]
+
+def consulta_frequencia_por_hora(data_inicio, data_fim):
+    """Entradas por hora, com hora_entrada em [data_inicio, data_fim)."""
+    query = """
+        SELECT 
+            DATE_FORMAT(hora_entrada, '%Y-%m-%d %H:00:00') as intervalo,
+            COUNT(*) as total_entradas
         FROM registros_refeitorio 
-        WHERE hora_entrada BETWEEN ? AND ?
-        GROUP BY turno
-        ORDER BY 
-            CASE turno
-                WHEN 'Café da Manhã' THEN 1
-                WHEN 'Almoço' THEN 2
-                WHEN 'Café da Tarde' THEN 3
-                WHEN 'Janta' THEN 4
-                ELSE 5
-            END
+        WHERE hora_entrada >= ? AND hora_entrada < ?
+        GROUP BY DATE_FORMAT(hora_entrada, '%Y-%m-%d %H:00:00')
+        ORDER BY intervalo
         """
+    return query, [data_inicio, data_fim]
+
+def consulta_relatorio_diario(data, turnos_filtro=None):
+    query = f"""
+        SELECT 
+            r.id,
+            r.aluno_id,
+            r.foto_hash,
+            r.hora_entrada,
+            r.hora_saida,
+            a.nome,
+            a.matricula,
+            a.curso,
+            {_nome_turno('r.turno')} as turno
+        FROM registros_refeitorio r
+        JOIN alunos a ON r.aluno_id = a.id
+        WHERE r.data_entrada = ?
+        """
+    params = [_como_data(data)]
+
+    # Adicionar filtro de turnos se especificado
+    filtro, turno_params = _filtro_turnos(turnos_filtro, 'r.turno')
+    query += filtro
+    params.extend(turno_params)
+
+    query += " ORDER BY r.hora_entrada"
+    return query, params
+
+def consultas_estatisticas_gerais(agora=None):
+    """Consultas (query, params) de obter_estatisticas_gerais, na ordem dos campos retornados."""
+    hoje = (agora or datetime.datetime.now()).date()
+    inicio_mes = hoje.replace(day=1)
+    return [
+        # Total de alunos
+        ('SELECT COUNT(*) FROM alunos', []),
+        # Total de registros hoje
+        ('SELECT COALESCE(SUM(total_entradas), 0) FROM resumo_refeicoes WHERE data_entrada = ? AND turno = ?',
+         [hoje, TURNO_DIA]),
+        # Total de registros este mês
+        ('SELECT COALESCE(SUM(total_entradas), 0) FROM resumo_refeicoes WHERE data_entrada >= ? AND turno = ?',
+         [inicio_mes, TURNO_DIA]),
+        # Alunos únicos hoje
+        ('SELECT COALESCE(SUM(alunos_unicos), 0) FROM resumo_refeicoes WHERE data_entrada = ? AND turno = ?',
+         [hoje, TURNO_DIA]),
+    ]
+
+def relatorio_entradas_por_turno(data_inicio=None, data_fim=None):
+    try:
+        # Período inclusivo em datas; sem data_fim, só o dia de data_inicio
+        if data_inicio is None:
+            data_inicio = datetime.datetime.now().date()
+        if data_fim is None:
+            data_fim = data_inicio
+        fim = _como_data(data_fim) + datetime.timedelta(days=1)
         
-        cursor.execute(query, (
-            cafe_manha_inicio, cafe_manha_fim,
-            almoco_inicio, almoco_fim,
-            cafe_tarde_inicio, cafe_tarde_fim,
-            janta_inicio, janta_fim,
-            data_inicio, data_fim
-        ))
-        
-        resultados = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
+        resultados, _ = _consultar(*consulta_entradas_por_turno(data_inicio, fim))
         return resultados
         
     except Exception as e:
@@ -173,9 +548,6 @@ def relatorio_entradas_por_turno(data_inicio=None, data_fim=None):
 
 def relatorio_semanal(data_inicio=None, turnos_filtro=None):
     try:
-        conn = conectar_db()
-        cursor = conn.cursor()
-        
         if data_inicio is None:
             hoje = datetime.datetime.now()
             dias_para_segunda = hoje.weekday()
@@ -184,62 +556,7 @@ def relatorio_semanal(data_inicio=None, turnos_filtro=None):
         
         data_fim = data_inicio + datetime.timedelta(days=7)
         
-        # Definindo os 4 turnos específicos
-        cafe_manha_inicio = datetime.time(9, 30)
-        cafe_manha_fim = datetime.time(9, 50)
-        almoco_inicio = datetime.time(11, 0)
-        almoco_fim = datetime.time(12, 50)
-        cafe_tarde_inicio = datetime.time(14, 30)
-        cafe_tarde_fim = datetime.time(14, 50)
-        janta_inicio = datetime.time(19, 30)
-        janta_fim = datetime.time(20, 40)
-        
-        # Construir filtro de turnos se especificado
-        turno_conditions = []
-        turno_params = []
-        
-        if turnos_filtro:
-            for turno in turnos_filtro:
-                if turno == 'Café da Manhã':
-                    turno_conditions.append("(TIME(hora_entrada) BETWEEN ? AND ?)")
-                    turno_params.extend([cafe_manha_inicio, cafe_manha_fim])
-                elif turno == 'Almoço':
-                    turno_conditions.append("(TIME(hora_entrada) BETWEEN ? AND ?)")
-                    turno_params.extend([almoco_inicio, almoco_fim])
-                elif turno == 'Café da Tarde':
-                    turno_conditions.append("(TIME(hora_entrada) BETWEEN ? AND ?)")
-                    turno_params.extend([cafe_tarde_inicio, cafe_tarde_fim])
-                elif turno == 'Janta':
-                    turno_conditions.append("(TIME(hora_entrada) BETWEEN ? AND ?)")
-                    turno_params.extend([janta_inicio, janta_fim])
-        
-        # Construir query base
-        query = """
-        SELECT 
-            DATE(hora_entrada) as data,
-            COUNT(*) as total_entradas,
-            COUNT(DISTINCT aluno_id) as alunos_unicos
-        FROM registros_refeitorio 
-        WHERE hora_entrada BETWEEN ? AND ?
-        """
-        
-        params = [data_inicio, data_fim]
-        
-        # Adicionar filtro de turnos se especificado
-        if turno_conditions:
-            query += " AND (" + " OR ".join(turno_conditions) + ")"
-            params.extend(turno_params)
-        
-        query += """
-        GROUP BY DATE(hora_entrada)
-        ORDER BY data
-        """
-        
-        cursor.execute(query, params)
-        resultados = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
+        resultados, _ = _consultar(*consulta_frequencia_por_dia(data_inicio, data_fim, turnos_filtro))
         return resultados
         
     except Exception as e:
@@ -248,9 +565,6 @@ def relatorio_semanal(data_inicio=None, turnos_filtro=None):
 
 def relatorio_mensal(ano=None, mes=None, turnos_filtro=None):
     try:
-        conn = conectar_db()
-        cursor = conn.cursor()
-        
         if ano is None or mes is None:
             hoje = datetime.datetime.now()
             ano = hoje.year
@@ -262,62 +576,7 @@ def relatorio_mensal(ano=None, mes=None, turnos_filtro=None):
         else:
             data_fim = datetime.datetime(ano, mes + 1, 1)
         
-        # Definindo os 4 turnos específicos
-        cafe_manha_inicio = datetime.time(9, 30)
-        cafe_manha_fim = datetime.time(9, 50)
-        almoco_inicio = datetime.time(11, 0)
-        almoco_fim = datetime.time(12, 50)
-        cafe_tarde_inicio = datetime.time(14, 30)
-        cafe_tarde_fim = datetime.time(14, 50)
-        janta_inicio = datetime.time(19, 30)
-        janta_fim = datetime.time(20, 40)
-        
-        # Construir filtro de turnos se especificado
-        turno_conditions = []
-        turno_params = []
-        
-        if turnos_filtro:
-            for turno in turnos_filtro:
-                if turno == 'Café da Manhã':
-                    turno_conditions.append("(TIME(hora_entrada) BETWEEN ? AND ?)")
-                    turno_params.extend([cafe_manha_inicio, cafe_manha_fim])
-                elif turno == 'Almoço':
-                    turno_conditions.append("(TIME(hora_entrada) BETWEEN ? AND ?)")
-                    turno_params.extend([almoco_inicio, almoco_fim])
-                elif turno == 'Café da Tarde':
-                    turno_conditions.append("(TIME(hora_entrada) BETWEEN ? AND ?)")
-                    turno_params.extend([cafe_tarde_inicio, cafe_tarde_fim])
-                elif turno == 'Janta':
-                    turno_conditions.append("(TIME(hora_entrada) BETWEEN ? AND ?)")
-                    turno_params.extend([janta_inicio, janta_fim])
-        
-        # Construir query base
-        query = """
-        SELECT 
-            DATE(hora_entrada) as data,
-            COUNT(*) as total_entradas,
-            COUNT(DISTINCT aluno_id) as alunos_unicos
-        FROM registros_refeitorio 
-        WHERE hora_entrada BETWEEN ? AND ?
-        """
-        
-        params = [data_inicio, data_fim]
-        
-        # Adicionar filtro de turnos se especificado
-        if turno_conditions:
-            query += " AND (" + " OR ".join(turno_conditions) + ")"
-            params.extend(turno_params)
-        
-        query += """
-        GROUP BY DATE(hora_entrada)
-        ORDER BY data
-        """
-        
-        cursor.execute(query, params)
-        resultados = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
+        resultados, _ = _consultar(*consulta_frequencia_por_dia(data_inicio, data_fim, turnos_filtro))
         return resultados
         
     except Exception as e:
@@ -333,39 +592,25 @@ def dados_grafico_frequencia_tempo(data_inicio=None, data_fim=None, intervalo_ho
         print(f"DEBUG: data_inicio = {data_inicio}")
         print(f"DEBUG: data_fim = {data_fim}")
         
-        conn = conectar_db()
-        cursor = conn.cursor()
-        
+        # Intervalo semiaberto [data_inicio, data_fim); sem datas, o dia de hoje
         if data_inicio is None:
             data_inicio = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         if data_fim is None:
-            data_fim = datetime.datetime.now().replace(hour=23, minute=59, second=59, microsecond=999999)
+            data_fim = data_inicio.replace(hour=0, minute=0, second=0, microsecond=0) + datetime.timedelta(days=1)
         
         print(f"DEBUG: Após ajustes - data_inicio = {data_inicio}")
         print(f"DEBUG: Após ajustes - data_fim = {data_fim}")
         
-        query = """
-        SELECT 
-            DATE_FORMAT(hora_entrada, '%Y-%m-%d %H:00:00') as intervalo,
-            COUNT(*) as total_entradas
-        FROM registros_refeitorio 
-        WHERE hora_entrada BETWEEN ? AND ?
-        GROUP BY DATE_FORMAT(hora_entrada, '%Y-%m-%d %H:00:00')
-        ORDER BY intervalo
-        """
+        query, params = consulta_frequencia_por_hora(data_inicio, data_fim)
         
         print(f"DEBUG: Query SQL: {query}")
         print(f"DEBUG: Parâmetros: data_inicio={data_inicio}, data_fim={data_fim}")
         
-        cursor.execute(query, (data_inicio, data_fim))
-        resultados = cursor.fetchall()
+        resultados, _ = _consultar(query, params)
         
         print(f"DEBUG: Resultados obtidos: {resultados}")
         print(f"DEBUG: Quantidade de resultados: {len(resultados)}")
         
-        cursor.close()
-        conn.close()
-        
         return resultados
         
     except Exception as e:
@@ -417,189 +662,122 @@ def gerar_grafico_frequencia(data_inicio=None, data_fim=None, salvar_arquivo='gr
         print(f'Erro ao gerar gráfico: {e}')
         return False
 
+
 def relatorio_diario(data=None, turnos_filtro=None):
     try:
-        conn = conectar_db()
-        cursor = conn.cursor()
-        
         if data is None:
             data = datetime.datetime.now().date()
         
-        # Definindo os 4 turnos específicos
-        cafe_manha_inicio = datetime.time(9, 30)
-        cafe_manha_fim = datetime.time(9, 50)
-        almoco_inicio = datetime.time(11, 0)
-        almoco_fim = datetime.time(12, 50)
-        cafe_tarde_inicio = datetime.time(14, 30)
-        cafe_tarde_fim = datetime.time(14, 50)
-        janta_inicio = datetime.time(19, 30)
-        janta_fim = datetime.time(20, 40)
-        
-        # Construir filtro de turnos se especificado
-        turno_conditions = []
-        turno_params = []
-        
-        if turnos_filtro:
-            for turno in turnos_filtro:
-                if turno == 'Café da Manhã':
-                    turno_conditions.append("(TIME(r.hora_entrada) BETWEEN ? AND ?)")
-                    turno_params.extend([cafe_manha_inicio, cafe_manha_fim])
-                elif turno == 'Almoço':
-                    turno_conditions.append("(TIME(r.hora_entrada) BETWEEN ? AND ?)")
-                    turno_params.extend([almoco_inicio, almoco_fim])
-                elif turno == 'Café da Tarde':
-                    turno_conditions.append("(TIME(r.hora_entrada) BETWEEN ? AND ?)")
-                    turno_params.extend([cafe_tarde_inicio, cafe_tarde_fim])
-                elif turno == 'Janta':
-                    turno_conditions.append("(TIME(r.hora_entrada) BETWEEN ? AND ?)")
-                    turno_params.extend([janta_inicio, janta_fim])
-        
-        # Construir query base
-        query = """
-        SELECT 
-            r.hora_entrada,
-            r.hora_saida,
-            a.nome,
-            a.matricula,
-            a.curso,
-            CASE 
-                WHEN TIME(r.hora_entrada) BETWEEN '09:30:00' AND '09:50:00' THEN 'Café da Manhã'
-                WHEN TIME(r.hora_entrada) BETWEEN '11:00:00' AND '12:50:00' THEN 'Almoço'
-                WHEN TIME(r.hora_entrada) BETWEEN '14:30:00' AND '14:50:00' THEN 'Café da Tarde'
-                WHEN TIME(r.hora_entrada) BETWEEN '19:30:00' AND '20:40:00' THEN 'Janta'
-                ELSE 'Outros'
-            END as turno
-        FROM registros_refeitorio r
-        JOIN alunos a ON r.aluno_id = a.id
-        WHERE DATE(r.hora_entrada) = ?
-        """
-        
-        params = [data]
-        
-        # Adicionar filtro de turnos se especificado
-        if turno_conditions:
-            query += " AND (" + " OR ".join(turno_conditions) + ")"
-            params.extend(turno_params)
-        
-        query += " ORDER BY r.hora_entrada"
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        columns = [desc[0] for desc in cursor.description]
+        rows, columns = _consultar(*consulta_relatorio_diario(data, turnos_filtro))
         registros = [dict(zip(columns, row)) for row in rows]
-        
-        cursor.close()
-        conn.close()
-        
         return registros
         
     except Exception as e:
         print(f'Erro ao gerar relatório diário: {e}')
         return []
 
+def carregar_estatisticas_gerais(agora=None):
+    """Como obter_estatisticas_gerais, mas propaga erros de banco (usado pelo ServicoEstatisticas)."""
+    valores = []
+    with obter_conexao() as conexao:
+        cursor = conexao.conn.cursor()
+        for query, params in consultas_estatisticas_gerais(agora):
+            cursor.execute(query, params)
+            valores.append(cursor.fetchone()[0])
+        cursor.close()
+    
+    total_alunos, registros_hoje, registros_mes, alunos_unicos_hoje = valores
+    return {
+        'total_alunos': total_alunos,
+        'registros_hoje': registros_hoje,
+        'registros_mes': registros_mes,
+        'alunos_unicos_hoje': alunos_unicos_hoje
+    }
+
 def obter_estatisticas_gerais():
     """
     Retorna estatísticas gerais do sistema
     """
     try:
-        conn = conectar_db()
-        cursor = conn.cursor()
-        
-        # Total de alunos
-        cursor.execute('SELECT COUNT(*) FROM alunos')
-        total_alunos = cursor.fetchone()[0]
-        
-        # Total de registros hoje
-        hoje = datetime.datetime.now().date()
-        cursor.execute('SELECT COUNT(*) FROM registros_refeitorio WHERE DATE(hora_entrada) = ?', (hoje,))
-        registros_hoje = cursor.fetchone()[0]
-        
-        # Total de registros este mês
-        inicio_mes = datetime.datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        cursor.execute('SELECT COUNT(*) FROM registros_refeitorio WHERE hora_entrada >= ?', (inicio_mes,))
-        registros_mes = cursor.fetchone()[0]
-        
-        # Alunos únicos hoje
-        cursor.execute('SELECT COUNT(DISTINCT aluno_id) FROM registros_refeitorio WHERE DATE(hora_entrada) = ?', (hoje,))
-        alunos_unicos_hoje = cursor.fetchone()[0]
-        
-        cursor.close()
-        conn.close()
-        
-        return {
-            'total_alunos': total_alunos,
-            'registros_hoje': registros_hoje,
-            'registros_mes': registros_mes,
-            'alunos_unicos_hoje': alunos_unicos_hoje
-        }
+        return carregar_estatisticas_gerais()
         
     except Exception as e:
         print(f'Erro ao obter estatísticas: {e}')
         return {}
 
+def listar_alunos_do_dia(data):
+    """Retorna o conjunto de ids dos alunos com entrada na data informada."""
+    with obter_conexao() as conexao:
+        cursor = conexao.conn.cursor()
+        cursor.execute('SELECT aluno_id FROM resumo_alunos WHERE data_entrada = ? AND turno = ?',
+                       (_como_data(data), TURNO_DIA))
+        ids = {row[0] for row in cursor.fetchall()}
+        cursor.close()
+    return ids
+
 def relatorio_por_periodo(data_inicio, data_fim, turnos_filtro=None):
     try:
-        conn = conectar_db()
-        cursor = conn.cursor()
-        
-        # Definindo os 4 turnos específicos
-        cafe_manha_inicio = datetime.time(9, 30)
-        cafe_manha_fim = datetime.time(9, 50)
-        almoco_inicio = datetime.time(11, 0)
-        almoco_fim = datetime.time(12, 50)
-        cafe_tarde_inicio = datetime.time(14, 30)
-        cafe_tarde_fim = datetime.time(14, 50)
-        janta_inicio = datetime.time(19, 30)
-        janta_fim = datetime.time(20, 40)
-        
-        # Construir filtro de turnos se especificado
-        turno_conditions = []
-        turno_params = []
-        
-        if turnos_filtro:
-            for turno in turnos_filtro:
-                if turno == 'Café da Manhã':
-                    turno_conditions.append("(TIME(hora_entrada) BETWEEN ? AND ?)")
-                    turno_params.extend([cafe_manha_inicio, cafe_manha_fim])
-                elif turno == 'Almoço':
-                    turno_conditions.append("(TIME(hora_entrada) BETWEEN ? AND ?)")
-                    turno_params.extend([almoco_inicio, almoco_fim])
-                elif turno == 'Café da Tarde':
-                    turno_conditions.append("(TIME(hora_entrada) BETWEEN ? AND ?)")
-                    turno_params.extend([cafe_tarde_inicio, cafe_tarde_fim])
-                elif turno == 'Janta':
-                    turno_conditions.append("(TIME(hora_entrada) BETWEEN ? AND ?)")
-                    turno_params.extend([janta_inicio, janta_fim])
-        
-        # Construir query base
-        query = """
-        SELECT 
-            DATE(hora_entrada) as data,
-            COUNT(*) as total_entradas,
-            COUNT(DISTINCT aluno_id) as alunos_unicos
-        FROM registros_refeitorio 
-        WHERE DATE(hora_entrada) BETWEEN ? AND ?
-        """
-        
-        params = [data_inicio, data_fim]
-        
-        # Adicionar filtro de turnos se especificado
-        if turno_conditions:
-            query += " AND (" + " OR ".join(turno_conditions) + ")"
-            params.extend(turno_params)
-        
-        query += """
-        GROUP BY DATE(hora_entrada)
-        ORDER BY data
-        """
-        
-        cursor.execute(query, params)
-        resultados = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        # Período inclusivo em datas: [data_inicio, dia seguinte a data_fim)
+        inicio = _como_data(data_inicio)
+        fim = _como_data(data_fim) + datetime.timedelta(days=1)
         
+        resultados, _ = _consultar(*consulta_frequencia_por_dia(inicio, fim, turnos_filtro))
         return resultados
         
     except Exception as e:
         print(f'Erro ao gerar relatório por período: {e}')
-        return []
\ No newline at end of file
+        return []
+
+def reconstruir_resumo(data_inicio=None, data_fim=None):
+    """Refaz resumo_refeicoes, resumo_alunos e resumo_turnos a partir de registros_refeitorio.
+
+    O resumo é mantido pelo trigger de inserção; a reconstrução só é
+    necessária depois de apagar ou corrigir registros à mão. Sem datas,
+    refaz tudo; com datas, só o período inclusivo [data_inicio, data_fim].
+    Roda numa única transação, e durante ela as inserções no período ficam
+    aguardando.
+    """
+    if data_inicio is None:
+        condicao, params = '', []
+    else:
+        fim = _como_data(data_fim or data_inicio) + datetime.timedelta(days=1)
+        condicao, params = ' WHERE data_entrada >= ? AND data_entrada < ?', [_como_data(data_inicio), fim]
+    fonte = f"FROM registros_refeitorio{condicao}{' AND' if condicao else ' WHERE'} hora_entrada IS NOT NULL"
+
+    # Transação explícita: o pool desfaz tudo se algum passo falhar
+    with obter_conexao() as conexao:
+        cursor = conexao.conn.cursor()
+        conexao.conn.begin()
+        cursor.execute('DELETE FROM resumo_alunos' + condicao, params)
+        cursor.execute('DELETE FROM resumo_refeicoes' + condicao, params)
+        cursor.execute('DELETE FROM resumo_turnos' + condicao, params)
+        cursor.execute(f"""
+            INSERT INTO resumo_alunos (data_entrada, turno, aluno_id)
+            SELECT DISTINCT data_entrada, turno, aluno_id {fonte}
+            UNION
+            SELECT DISTINCT data_entrada, {TURNO_DIA}, aluno_id {fonte}
+            """, params + params)
+        cursor.execute(f"""
+            INSERT INTO resumo_refeicoes (data_entrada, turno, total_entradas, alunos_unicos)
+            SELECT data_entrada, turno, COUNT(*), COUNT(DISTINCT aluno_id) {fonte}
+            GROUP BY data_entrada, turno
+            UNION ALL
+            SELECT data_entrada, {TURNO_DIA}, COUNT(*), COUNT(DISTINCT aluno_id) {fonte}
+            GROUP BY data_entrada
+            """, params + params)
+        # Cada aluno conta em todas as combinações que incluem algum turno em que comeu no dia
+        mascaras = ' UNION ALL '.join(f'SELECT {m} AS mascara' for m in range(1, MASCARA_TODOS + 1))
+        cursor.execute(f"""
+            INSERT INTO resumo_turnos (data_entrada, mascara, alunos_unicos)
+            SELECT a.data_entrada, m.mascara, COUNT(*)
+            FROM (
+                SELECT data_entrada, aluno_id, BIT_OR(1 << (turno - 1)) as turnos
+                FROM resumo_alunos WHERE turno <> {TURNO_DIA}{condicao.replace(' WHERE', ' AND', 1)}
+                GROUP BY data_entrada, aluno_id
+            ) a
+            JOIN ({mascaras}) m ON a.turnos & m.mascara <> 0
+            GROUP BY a.data_entrada, m.mascara
+            """, params)
+        conexao.conn.commit()
+        cursor.close()
+    print('Resumo de refeições reconstruído')
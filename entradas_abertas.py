@@ -0,0 +1,100 @@
+import threading
+
+from db_utils import listar_entradas_abertas
+from tarefa_periodica import TarefaPeriodica
+
+# Intervalo (segundos) entre as reconciliações com o banco
+INTERVALO_RECONCILIACAO = 30
+
+
+class EntradasAbertas:
+    """Conjunto, em memória, dos alunos que entraram e ainda não saíram.
+
+    Carregado do banco com uma consulta na inicialização, atualizado a cada
+    registro feito neste quiosque e reconciliado periodicamente com o banco
+    (para refletir registros de outros quiosques). Decide se a leitura é
+    entrada ou saída sem consultar o banco. Com um `armazem` (ArmazemLocal),
+    os registros ainda no diário local são aplicados sobre o estado do banco,
+    e o conjunto é copiado para o disco, de onde parte a carga inicial sem
+    acesso ao banco.
+    """
+
+    def __init__(self, armazem=None):
+        self.armazem = armazem
+        self._abertas = set()
+        self._lock = threading.Lock()
+        # Registros feitos durante uma reconciliação, reaplicados sobre o resultado dela
+        self._durante_reconciliacao = None
+        self._tarefa = None
+
+    def __len__(self):
+        return len(self._abertas)
+
+    def esta_dentro(self, aluno_id):
+        """True se o aluno tem entrada aberta (a próxima leitura é uma saída)."""
+        return aluno_id in self._abertas
+
+    def registrar(self, aluno_id, tipo):
+        """Atualiza o conjunto após um registro de 'entrada' ou 'saida'."""
+        with self._lock:
+            self._aplicar(self._abertas, aluno_id, tipo)
+            if self._durante_reconciliacao is not None:
+                self._durante_reconciliacao.append((aluno_id, tipo))
+            if self.armazem is not None:
+                self.armazem.aplicar_movimento(aluno_id, tipo)
+
+    @staticmethod
+    def _aplicar(abertas, aluno_id, tipo):
+        if tipo == 'entrada':
+            abertas.add(aluno_id)
+        else:
+            abertas.discard(aluno_id)
+
+    def reconciliar(self):
+        """Substitui o conjunto pelo estado do banco, preservando registros feitos no meio tempo."""
+        with self._lock:
+            self._durante_reconciliacao = []
+        try:
+            # Lido antes do banco: um registro gravado entre as duas leituras
+            # aparece nas duas, e reaplicá-lo em ordem não muda o resultado
+            pendentes = self.armazem.movimentos_pendentes() if self.armazem is not None else []
+            abertas = listar_entradas_abertas()
+        except Exception:
+            with self._lock:
+                self._durante_reconciliacao = None
+            raise
+        with self._lock:
+            for aluno_id, tipo in pendentes + self._durante_reconciliacao:
+                self._aplicar(abertas, aluno_id, tipo)
+            self._abertas = abertas
+            self._durante_reconciliacao = None
+            if self.armazem is not None:
+                self.armazem.salvar_entradas_abertas(abertas)
+
+    def carregar(self):
+        """Carga inicial a partir do banco (ou da cópia local, com o banco fora do ar).
+
+        Retorna False quando usou a cópia local.
+        """
+        do_banco = True
+        try:
+            self.reconciliar()
+        except Exception as e:
+            do_banco = False
+            if self.armazem is None:
+                raise
+            print(f'Banco indisponível ({e}); usando cópia local das entradas abertas')
+            with self._lock:
+                self._abertas = self.armazem.carregar_entradas_abertas()
+        print(f'Entradas abertas carregadas: {len(self._abertas)}')
+        return do_banco
+
+    def iniciar_reconciliacao_periodica(self, intervalo=INTERVALO_RECONCILIACAO):
+        """Traz para o conjunto, a cada `intervalo` segundos, os registros de outros quiosques."""
+        self._tarefa = TarefaPeriodica(self.reconciliar, intervalo, 'entradas-abertas',
+                                       'reconciliar entradas abertas').iniciar()
+
+    def parar(self):
+        """Interrompe a thread periódica e espera a execução em andamento."""
+        if self._tarefa is not None:
+            self._tarefa.parar()
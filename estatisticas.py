@@ -0,0 +1,103 @@
+import datetime
+import threading
+
+from db_utils import carregar_estatisticas_gerais, listar_alunos_do_dia
+from tarefa_periodica import TarefaPeriodica
+
+# Intervalo (segundos) entre as reconciliações com o banco
+INTERVALO_RECONCILIACAO = 300
+
+
+class ServicoEstatisticas:
+    """Contadores do cabeçalho (registros do dia e do mês, alunos únicos do dia) em memória.
+
+    Carregados do banco na inicialização e incrementados a cada entrada
+    registrada neste quiosque, então o cabeçalho é atualizado sem consultas.
+    Na virada do dia (e do mês) os contadores recomeçam do zero. Uma
+    reconciliação periódica, que lê só o resumo de refeições, traz os
+    registros feitos em outros quiosques e corrige qualquer divergência. Com
+    um `armazem` (ArmazemLocal), as entradas ainda no diário local (banco fora
+    do ar ou gravação atrasada) são somadas ao que veio do banco. O total de
+    alunos vem do cache do cadastro, quando informado.
+    """
+
+    def __init__(self, cache_alunos=None, armazem=None):
+        self.cache_alunos = cache_alunos
+        self.armazem = armazem
+        self._dia = datetime.date.today()
+        self._registros_hoje = 0
+        self._registros_mes = 0
+        self._alunos_hoje = set()
+        self._total_alunos = 0
+        self._lock = threading.Lock()
+        self._tarefa = None
+
+    def _virar_dia(self, dia):
+        """Zera os contadores se `dia` já não é o dia corrente (chamado com o lock)."""
+        if dia <= self._dia:
+            return
+        if (dia.year, dia.month) != (self._dia.year, self._dia.month):
+            self._registros_mes = 0
+        self._registros_hoje = 0
+        self._alunos_hoje = set()
+        self._dia = dia
+
+    def registrar(self, aluno_id, tipo, momento=None):
+        """Contabiliza um registro feito neste quiosque (só entradas contam)."""
+        if tipo != 'entrada':
+            return
+        dia = (momento or datetime.datetime.now()).date()
+        with self._lock:
+            self._virar_dia(dia)
+            if dia != self._dia:
+                return  # Registro de um dia que já passou: fica para a reconciliação
+            self._registros_hoje += 1
+            self._registros_mes += 1
+            self._alunos_hoje.add(aluno_id)
+
+    def valores(self):
+        """Estatísticas atuais, no mesmo formato de db_utils.obter_estatisticas_gerais()."""
+        with self._lock:
+            self._virar_dia(datetime.date.today())
+            total_alunos = len(self.cache_alunos) if self.cache_alunos is not None else 0
+            return {
+                'total_alunos': total_alunos or self._total_alunos,
+                'registros_hoje': self._registros_hoje,
+                'registros_mes': self._registros_mes,
+                'alunos_unicos_hoje': len(self._alunos_hoje),
+            }
+
+    def reconciliar(self):
+        """Substitui os contadores pelos valores do banco."""
+        agora = datetime.datetime.now()
+        stats = carregar_estatisticas_gerais(agora)
+        alunos_hoje = listar_alunos_do_dia(agora)
+        # Lido depois do banco: um registro gravado entre as duas leituras fica
+        # de fora só até a próxima reconciliação, em vez de contar duas vezes
+        pendentes = self.armazem.entradas_pendentes() if self.armazem is not None else []
+        hoje = agora.date()
+        pendentes_hoje = [aluno_id for aluno_id, momento in pendentes if momento.date() == hoje]
+        pendentes_mes = [m for _, m in pendentes if (m.year, m.month) == (hoje.year, hoje.month) and m.date() <= hoje]
+        with self._lock:
+            if hoje < self._dia:
+                return  # O dia virou durante a consulta
+            self._dia = hoje
+            self._registros_hoje = stats['registros_hoje'] + len(pendentes_hoje)
+            self._registros_mes = stats['registros_mes'] + len(pendentes_mes)
+            self._alunos_hoje = alunos_hoje | set(pendentes_hoje)
+            self._total_alunos = stats['total_alunos']
+
+    def carregar(self):
+        """Carga inicial a partir do banco."""
+        self.reconciliar()
+        print(f'Estatísticas carregadas: {self._registros_hoje} registros hoje, {self._registros_mes} no mês')
+
+    def iniciar_reconciliacao_periodica(self, intervalo=INTERVALO_RECONCILIACAO):
+        """Corrige os contadores pelo resumo do banco a cada `intervalo` segundos."""
+        self._tarefa = TarefaPeriodica(self.reconciliar, intervalo, 'estatisticas',
+                                       'reconciliar estatísticas').iniciar()
+
+    def parar(self):
+        """Interrompe a thread periódica e espera a execução em andamento."""
+        if self._tarefa is not None:
+            self._tarefa.parar()
@@ -1,53 +1,202 @@
 import cv2
 import numpy as np
+from contexto_frame import ContextoFrame
 
-def detectar_rosto_e_overlay(frame, face_cascade):
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(120, 120))
-    overlay_frame = frame.copy()
+CASCATA_PADRAO = 'haarcascade_frontalface_default.xml'
+
+def carregar_cascata(arquivo=CASCATA_PADRAO):
+    """Carrega uma das cascatas Haar distribuídas com o OpenCV."""
+    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + arquivo)
+    if face_cascade.empty():
+        raise ValueError(f'Cascata não encontrada: {arquivo}')
+    return face_cascade
+
+class DetectorHaar:
+    """Detector de rosto que roda a cascata Haar no frame inteiro, em resolução cheia.
+
+    Todo detector expõe `detectar(contexto)`, que recebe um ContextoFrame e
+    retorna uma lista de caixas (x, y, w, h) em coordenadas do frame, e `reiniciar()`, chamado quando um
+    novo aluno começa a captura.
+    """
+
+    def __init__(self, face_cascade, min_tamanho=(120, 120)):
+        self.face_cascade = face_cascade
+        self.min_tamanho = min_tamanho
+
+    def reiniciar(self):
+        pass
+
+    def detectar(self, contexto):
+        faces = self.face_cascade.detectMultiScale(contexto.gray, scaleFactor=1.1, minNeighbors=5, minSize=self.min_tamanho)
+        return [tuple(int(v) for v in face) for face in faces]
+
+class RastreadorRosto:
+    """Detecta rostos numa imagem reduzida, restringindo a busca ao redor do último rosto.
+
+    A cada `intervalo_redeteccao` frames (ou quando o rosto some da região
+    rastreada) a busca é feita no frame inteiro. As caixas retornadas já estão
+    em coordenadas da resolução original, prontas para o recorte da foto.
+    """
+
+    def __init__(self, face_cascade, escala=0.5, margem=0.4, intervalo_redeteccao=10,
+                 min_tamanho=(120, 120)):
+        self.face_cascade = face_cascade
+        self.escala = escala
+        self.margem = margem
+        self.intervalo_redeteccao = intervalo_redeteccao
+        self.min_tamanho = min_tamanho
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Descarta o rosto rastreado; a próxima detecção varre o frame inteiro."""
+        self._ultimo_rosto = None
+        self._frames = 0
+
+    def detectar(self, contexto):
+        """Retorna a lista de rostos (x, y, w, h) encontrados no frame do ContextoFrame."""
+        self._frames += 1
+        gray = contexto.gray_reduzido(self.escala)
+        altura, largura = contexto.shape[:2]
+        frame_inteiro = (0, 0, largura, altura)
+
+        if self._ultimo_rosto is not None and self._frames % self.intervalo_redeteccao != 0:
+            faces = self._detectar_regiao(gray, self._expandir(self._ultimo_rosto, largura, altura))
+            if not faces:
+                # Rosto saiu da região rastreada: procura no frame inteiro
+                faces = self._detectar_regiao(gray, frame_inteiro)
+        else:
+            faces = self._detectar_regiao(gray, frame_inteiro)
+
+        self._ultimo_rosto = faces[0] if faces else None
+        return faces
+
+    def _detectar_regiao(self, gray, regiao):
+        # `gray` já está reduzido; `regiao` está em coordenadas do frame original
+        rx, ry, rw, rh = regiao
+        x0, y0 = int(rx * self.escala), int(ry * self.escala)
+        x1, y1 = int((rx + rw) * self.escala), int((ry + rh) * self.escala)
+        reduzido = gray[y0:y1, x0:x1]
+        min_size = (int(self.min_tamanho[0] * self.escala), int(self.min_tamanho[1] * self.escala))
+        faces = self.face_cascade.detectMultiScale(reduzido, scaleFactor=1.1, minNeighbors=5, minSize=min_size)
+        # Converte as caixas de volta para a resolução original
+        return [(rx + int(x / self.escala), ry + int(y / self.escala), int(w / self.escala), int(h / self.escala))
+                for (x, y, w, h) in faces]
+
+    def _expandir(self, rosto, largura, altura):
+        x, y, w, h = rosto
+        mx, my = int(w * self.margem), int(h * self.margem)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(largura, x + w + mx), min(altura, y + h + my)
+        return x0, y0, x1 - x0, y1 - y0
+
+# Detectores disponíveis, do mais preciso (cascata padrão) aos mais rápidos.
+# As cascatas 'alt' acompanham o OpenCV em cv2.data.haarcascades.
+DETECTORES = {
+    'haar': lambda: DetectorHaar(carregar_cascata()),
+    'haar_alt': lambda: DetectorHaar(carregar_cascata('haarcascade_frontalface_alt.xml')),
+    'haar_alt2': lambda: DetectorHaar(carregar_cascata('haarcascade_frontalface_alt2.xml')),
+    'haar_reduzido': lambda: RastreadorRosto(carregar_cascata()),
+    'haar_alt2_reduzido': lambda: RastreadorRosto(carregar_cascata('haarcascade_frontalface_alt2.xml')),
+}
+
+DETECTOR_PADRAO = 'haar_reduzido'
+
+def criar_detector(nome=DETECTOR_PADRAO):
+    """Cria o detector de rosto registrado em DETECTORES com o nome informado."""
+    if nome not in DETECTORES:
+        raise ValueError(f'Detector desconhecido: {nome}. Opções: {", ".join(DETECTORES)}')
+    return DETECTORES[nome]()
+
+# Camadas com os elementos fixos do overlay, por (largura, altura, estado)
+_camadas_guia = {}
+
+def _camada_guia(largura, altura, estado):
+    """Retorna (camada, mascara_inversa) com o oval guia e os textos, desenhados uma única vez.
+
+    `estado` é None (nenhum rosto), 'centralizado' ou 'descentralizado' e
+    define o texto de status incluído na camada.
+    """
+    chave = (largura, altura, estado)
+    if chave not in _camadas_guia:
+        camada = np.zeros((altura, largura, 3), dtype=np.uint8)
+
+        # Desenhar oval guia no centro da tela
+        cv2.ellipse(camada, (largura // 2, altura // 2), (80, 100), 0, 0, 360, (0, 255, 0), 2)
+
+        # Adicionar texto de instrução
+        cv2.putText(camada, 'Encaixe seu rosto', (30, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+
+        if estado == 'centralizado':
+            cv2.putText(camada, 'ROSTO CENTRALIZADO!', (30, 60),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+        elif estado == 'descentralizado':
+            cv2.putText(camada, 'Centralize o rosto', (30, 60),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+
+        desenhado = np.any(camada != 0, axis=2)
+        mascara_inversa = np.where(desenhado, 0, 255).astype(np.uint8)
+        mascara_inversa = np.repeat(mascara_inversa[:, :, np.newaxis], 3, axis=2)
+        _camadas_guia[chave] = (camada, mascara_inversa)
+    return _camadas_guia[chave]
+
+def detectar_rosto_e_overlay(contexto, detector, executar_deteccao=True):
+    """Detecta o rosto e desenha o overlay de captura.
+
+    Com `executar_deteccao=False` a detecção é pulada (cena parada, sem
+    rosto) e só o overlay sem rosto é desenhado.
+    """
+    frame = contexto.frame
+    faces = detector.detectar(contexto) if executar_deteccao else []
     rosto_centralizado = False
     bbox = None
-    
-    # Desenhar oval guia no centro da tela
+    estado = None
+    elipse_rosto = None
+
     frame_h, frame_w = frame.shape[:2]
     center_x, center_y = frame_w // 2, frame_h // 2
-    cv2.ellipse(overlay_frame, (center_x, center_y), (80, 100), 0, 0, 360, (0, 255, 0), 2)
-    
-    # Adicionar texto de instrução
-    cv2.putText(overlay_frame, 'Encaixe seu rosto', (30, 30), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-    
+
     for (x, y, w, h) in faces:
-        # Desenhar oval ao redor do rosto detectado
         face_center = (x + w // 2, y + h // 2)
         face_axes = (w // 2, h // 2)
-        
+
         # Verificar se o rosto está centralizado
         if (abs(face_center[0] - center_x) < 50) and (abs(face_center[1] - center_y) < 50):
             # Rosto centralizado - desenhar em verde
-            cv2.ellipse(overlay_frame, face_center, face_axes, 0, 0, 360, (0, 255, 0), 3)
+            elipse_rosto = (face_center, face_axes, (0, 255, 0), 3)
             rosto_centralizado = True
             bbox = (x, y, w, h)
-            cv2.putText(overlay_frame, 'ROSTO CENTRALIZADO!', (30, 60), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+            estado = 'centralizado'
         else:
             # Rosto não centralizado - desenhar em vermelho
-            cv2.ellipse(overlay_frame, face_center, face_axes, 0, 0, 360, (0, 0, 255), 2)
-            cv2.putText(overlay_frame, 'Centralize o rosto', (30, 60), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+            elipse_rosto = (face_center, face_axes, (0, 0, 255), 2)
+            estado = 'descentralizado'
         break  # Só considera o primeiro rosto
-    
+
+    # Compõe a camada fixa sobre o frame; o resultado já é um buffer novo,
+    # então o frame original (usado no recorte da foto) não é alterado
+    camada, mascara_inversa = _camada_guia(frame_w, frame_h, estado)
+    overlay_frame = cv2.bitwise_and(frame, mascara_inversa)
+    cv2.bitwise_or(overlay_frame, camada, dst=overlay_frame)
+
+    # Só o oval ao redor do rosto detectado é desenhado a cada frame
+    if elipse_rosto is not None:
+        centro, eixos, cor, espessura = elipse_rosto
+        cv2.ellipse(overlay_frame, centro, eixos, 0, 0, 360, cor, espessura)
+
     return overlay_frame, rosto_centralizado, bbox
 
 def capturar_foto_automaticamente():
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    detector = criar_detector()
     cap = cv2.VideoCapture(0)
     foto = None
+    numero = 0
     while True:
         ret, frame = cap.read()
         if not ret:
             break
-        overlay_frame, centralizado, bbox = detectar_rosto_e_overlay(frame, face_cascade)
+        numero += 1
+        overlay_frame, centralizado, bbox = detectar_rosto_e_overlay(ContextoFrame(numero, frame), detector)
         cv2.putText(overlay_frame, 'Encaixe seu rosto no oval', (30, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,0), 2)
         cv2.imshow('Captura de Foto', overlay_frame)
         if centralizado:
@@ -0,0 +1,139 @@
+import datetime
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+# Formato das fotos gravadas: 'jpeg' ou 'webp'
+CODEC_FOTO = 'jpeg'
+# Qualidade de 0 a 100 (para WebP, acima de 100 é sem perdas). Na resolução
+# canônica, 80 mantém o rosto nítido o bastante para conferência
+QUALIDADE_FOTO = 80
+# Resolução canônica das fotos gravadas (largura, altura), em retrato 4:5
+TAMANHO_FOTO = (192, 240)
+# Margem acrescentada em volta do rosto detectado, em fração da largura/altura dele
+MARGEM_FOTO = 0.2
+# Miniatura usada nas listagens (largura, altura) e sua qualidade JPEG
+TAMANHO_MINIATURA = (48, 60)
+QUALIDADE_MINIATURA = 70
+
+CODECS = {
+    'jpeg': ('.jpg', cv2.IMWRITE_JPEG_QUALITY),
+    'webp': ('.webp', cv2.IMWRITE_WEBP_QUALITY),
+}
+
+def _ajustar_proporcao(x, y, w, h):
+    """Aumenta a caixa no lado menor, mantendo o centro, até a proporção de TAMANHO_FOTO."""
+    largura, altura = TAMANHO_FOTO
+    if w * altura < h * largura:
+        novo_w = h * largura / altura
+        x -= (novo_w - w) / 2
+        w = novo_w
+    else:
+        novo_h = w * altura / largura
+        y -= (novo_h - h) / 2
+        h = novo_h
+    return int(round(x)), int(round(y)), int(round(w)), int(round(h))
+
+def recortar_rosto(frame, bbox, margem=MARGEM_FOTO):
+    """Recorta o rosto do frame já no formato canônico (TAMANHO_FOTO).
+
+    A caixa do detector é ampliada pela margem e pela proporção canônica; o
+    que cair fora do frame é preenchido repetindo a borda da imagem.
+    """
+    x, y, w, h = bbox
+    x, y, w, h = _ajustar_proporcao(x - w * margem, y - h * margem, w * (1 + 2 * margem), h * (1 + 2 * margem))
+    altura_frame, largura_frame = frame.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, largura_frame), min(y + h, altura_frame)
+    recorte = frame[y0:y1, x0:x1]
+    if (x0, y0, x1, y1) != (x, y, x + w, y + h):
+        recorte = cv2.copyMakeBorder(recorte, y0 - y, y + h - y1, x0 - x, x + w - x1, cv2.BORDER_REPLICATE)
+    return cv2.resize(recorte, TAMANHO_FOTO, interpolation=cv2.INTER_AREA)
+
+def normalizar_foto(foto_np):
+    """Leva uma foto já recortada (de qualquer tamanho) ao formato canônico.
+
+    Ao contrário de recortar_rosto, não preenche nada: corta o excesso do lado
+    maior, mantendo o centro, até a proporção de TAMANHO_FOTO (as fotos
+    antigas, quadradas, perdem faixas nas laterais em vez de ganhar bordas
+    repetidas em cima e embaixo).
+    """
+    if foto_np.shape[1::-1] == TAMANHO_FOTO:
+        return foto_np
+    largura_canonica, altura_canonica = TAMANHO_FOTO
+    altura, largura = foto_np.shape[:2]
+    if largura * altura_canonica > altura * largura_canonica:
+        nova_largura = max(1, int(round(altura * largura_canonica / altura_canonica)))
+        x = (largura - nova_largura) // 2
+        foto_np = foto_np[:, x:x + nova_largura]
+    else:
+        nova_altura = max(1, int(round(largura * altura_canonica / largura_canonica)))
+        y = (altura - nova_altura) // 2
+        foto_np = foto_np[y:y + nova_altura]
+    return cv2.resize(foto_np, TAMANHO_FOTO, interpolation=cv2.INTER_AREA)
+
+def codificar_foto(foto_np, codec=CODEC_FOTO, qualidade=QUALIDADE_FOTO):
+    """Codifica uma imagem numpy (BGR) direto para bytes, sem conversão de cor."""
+    if codec not in CODECS:
+        raise ValueError(f"Codec de foto desconhecido: {codec} (disponíveis: {', '.join(CODECS)})")
+    extensao, parametro = CODECS[codec]
+    ok, buffer = cv2.imencode(extensao, foto_np, [parametro, int(qualidade)])
+    if not ok:
+        raise ValueError(f'Falha ao codificar foto como {codec}')
+    return buffer.tobytes()
+
+def gerar_miniatura(foto_bytes):
+    """Miniatura JPEG (TAMANHO_MINIATURA) de uma foto codificada, ou None se ela não decodificar."""
+    imagem = cv2.imdecode(np.frombuffer(foto_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if imagem is None:
+        return None
+    miniatura = cv2.resize(normalizar_foto(imagem), TAMANHO_MINIATURA, interpolation=cv2.INTER_AREA)
+    return codificar_foto(miniatura, 'jpeg', QUALIDADE_MINIATURA)
+
+
+class CodificadorFotos:
+    """Registra no gravador e codifica as fotos fora da thread da interface.
+
+    O registro vai para o diário local na própria chamada, antes de o aluno
+    ser liberado, marcado como aguardando a foto; só a codificação fica na
+    thread, e a foto é anexada ao registro quando fica pronta. O gravador
+    não envia ao banco um registro (nem os seguintes) enquanto a foto dele
+    não chega, então a ordem dos registros é mantida.
+    """
+
+    def __init__(self, gravador, codec=CODEC_FOTO, qualidade=QUALIDADE_FOTO):
+        if codec not in CODECS:
+            raise ValueError(f"Codec de foto desconhecido: {codec} (disponíveis: {', '.join(CODECS)})")
+        self.gravador = gravador
+        self.codec = codec
+        self.qualidade = qualidade
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='codificador-fotos')
+
+    def registrar(self, aluno_id, tipo, foto_np=None):
+        """Grava o registro no diário e agenda a codificação da foto. Retorna o horário registrado."""
+        momento = datetime.datetime.now().replace(microsecond=0)
+        uid = self.gravador.registrar(aluno_id, tipo, momento=momento, aguardando_foto=foto_np is not None)
+        if foto_np is not None:
+            # Cópia própria: quem chamou pode reaproveitar o array
+            self._executor.submit(self._codificar_e_anexar, uid, aluno_id, foto_np.copy())
+        return momento
+
+    def _codificar_e_anexar(self, uid, aluno_id, foto_np):
+        try:
+            foto_bytes = codificar_foto(foto_np, self.codec, self.qualidade)
+        except Exception as e:
+            print(f'Erro ao codificar foto do aluno {aluno_id}: {e}')
+            traceback.print_exc()
+            # Sem a foto, o registro ainda vale
+            foto_bytes = None
+        try:
+            self.gravador.anexar_foto(uid, foto_bytes)
+        except Exception as e:
+            print(f'Erro ao anexar foto do aluno {aluno_id} ao diário: {e}')
+            traceback.print_exc()
+
+    def encerrar(self):
+        """Termina de codificar e anexar as fotos já agendadas."""
+        self._executor.shutdown(wait=True)
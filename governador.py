@@ -0,0 +1,73 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class GovernadorTaxa:
+    """Mede o custo dos estágios do loop de processamento e adapta a taxa à carga.
+
+    O custo de cada estágio por frame é acompanhado por média móvel
+    exponencial (estágios que não rodaram no frame contam zero). O
+    intervalo sugerido para o timer cresce quando a soma dos custos se
+    aproxima do período entre ticks, deixando folga para o loop de eventos do
+    Qt; os frames capturados nesse meio tempo são descartados pelo buffer da
+    câmera e contados em `frames_pulados`.
+    """
+
+    def __init__(self, intervalo_minimo_ms=15, fps_minimo=5, folga=0.25, suavizacao=0.1):
+        self.intervalo_minimo_ms = intervalo_minimo_ms
+        self.intervalo_maximo_ms = int(1000 / fps_minimo)
+        self.folga = folga
+        self.suavizacao = suavizacao
+        self.frames_pulados = 0
+        self._custos = {}
+        self._custos_frame = {}
+        self._instantes = deque(maxlen=60)
+        self._ultimo_numero = None
+
+    @contextmanager
+    def medir(self, estagio):
+        """Mede o tempo gasto no bloco e o soma ao custo do estágio no frame atual."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            self._custos_frame[estagio] = self._custos_frame.get(estagio, 0.0) + duracao
+
+    def registrar_frame(self, numero_frame):
+        """Fecha as medições do frame processado e atualiza FPS efetivo e descartes."""
+        for estagio in set(self._custos) | set(self._custos_frame):
+            duracao = self._custos_frame.get(estagio, 0.0)
+            anterior = self._custos.get(estagio)
+            if anterior is None:
+                self._custos[estagio] = duracao
+            else:
+                self._custos[estagio] = anterior + self.suavizacao * (duracao - anterior)
+        self._custos_frame.clear()
+
+        self._instantes.append(time.monotonic())
+        if self._ultimo_numero is not None and numero_frame > self._ultimo_numero + 1:
+            self.frames_pulados += numero_frame - self._ultimo_numero - 1
+        self._ultimo_numero = numero_frame
+
+    def custos(self):
+        """Custo médio de cada estágio, em milissegundos."""
+        return {estagio: custo * 1000 for estagio, custo in self._custos.items()}
+
+    @property
+    def fps_efetivo(self):
+        """Frames processados por segundo, nos últimos frames registrados."""
+        if len(self._instantes) < 2:
+            return 0.0
+        # Mede até agora, para que a câmera parada derrube o valor
+        decorrido = time.monotonic() - self._instantes[0]
+        if decorrido <= 0:
+            return 0.0
+        return (len(self._instantes) - 1) / decorrido
+
+    def intervalo_ms(self):
+        """Intervalo sugerido para o timer do loop de processamento."""
+        custo_total_ms = sum(self._custos.values()) * 1000
+        intervalo = int(custo_total_ms * (1 + self.folga))
+        return min(max(intervalo, self.intervalo_minimo_ms), self.intervalo_maximo_ms)
@@ -0,0 +1,184 @@
+import datetime
+import threading
+import time
+import traceback
+import uuid
+
+import mariadb
+
+from db_utils import gravar_registros, verificar_conexao
+
+# Registros gravados no banco por transação (a sincronização após um período offline vai em lotes deste tamanho)
+TAMANHO_LOTE = 100
+# Espera (segundos) entre tentativas com o banco fora do ar, dobrando até o máximo
+ESPERA_INICIAL = 1.0
+ESPERA_MAXIMA = 60.0
+# Falhas de acesso ao banco (não do registro): o lote inteiro espera e é tentado de novo
+ERROS_CONEXAO = (mariadb.InterfaceError, mariadb.OperationalError, mariadb.PoolError)
+# Com o diário vazio, o banco é sondado (ping) a cada tantos segundos
+INTERVALO_VERIFICACAO = 5.0
+# Sem nenhum contato bem-sucedido com o banco por mais que isso (gravação
+# travada, sondagem sem resposta), o quiosque passa a se considerar offline
+LIMITE_SEM_CONTATO = 15.0
+
+
+class GravadorRegistros:
+    """Grava no MariaDB, em segundo plano, os registros anexados ao diário local.
+
+    `registrar()` só anexa ao diário (ArmazemLocal) e retorna: o aluno é
+    liberado sem esperar o banco. A foto pode ser anexada depois
+    (`anexar_foto()`), quando a codificação terminar. Uma thread esvazia o diário em lotes, na
+    ordem dos registros. Com o banco fora do ar, tenta de novo com espera
+    crescente; o quiosque continua registrando no diário nesse meio tempo.
+
+    `online` reflete se o banco responde de fato: com o diário vazio, a
+    thread sonda o banco a cada INTERVALO_VERIFICACAO segundos, e sem contato
+    bem-sucedido (gravação ou sondagem) há mais de LIMITE_SEM_CONTATO segundos
+    o quiosque é considerado offline, mesmo com a thread presa numa consulta.
+    Registros feitos offline são marcados no diário (ver
+    db_utils.gravar_registros). Um lote
+    recusado pelo banco é regravado registro a registro, para que só o
+    registro com problema conte tentativa. Registros descartados por conflito
+    com outros quiosques (ver db_utils.gravar_registros) saem do diário para a
+    tabela de conflitos, são mostrados no log e contados em `descartados`,
+    que a interface exibe. O que sobrar no diário ao fechar é gravado na
+    próxima inicialização.
+    """
+
+    def __init__(self, armazem, tamanho_lote=TAMANHO_LOTE):
+        self.armazem = armazem
+        self.tamanho_lote = tamanho_lote
+        self._novo = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+        self._conectado = True
+        self._ultimo_contato = time.monotonic()
+        # Registros descartados por conflito desde que o quiosque abriu
+        self.descartados = 0
+        # Registros no diário, contados em memória: a interface consulta a cada
+        # poucos segundos, sem ir ao SQLite (só a carga inicial faz o COUNT)
+        self._pendentes = len(armazem)
+        self._lock_pendentes = threading.Lock()
+
+    @property
+    def pendentes(self):
+        return self._pendentes
+
+    @property
+    def online(self):
+        return self._conectado and time.monotonic() - self._ultimo_contato < LIMITE_SEM_CONTATO
+
+    def _contato(self):
+        """Registra uma operação bem-sucedida no banco (chamado pela thread de gravação)."""
+        if not self.online:
+            print(f'Banco disponível de novo ({self.pendentes} registros a sincronizar)')
+        self._ultimo_contato = time.monotonic()
+        self._conectado = True
+
+    def marcar_offline(self, motivo=None):
+        """Considera o banco fora do ar até o próximo contato bem-sucedido."""
+        if self.online:
+            print(f'Banco indisponível, operando offline{f": {motivo}" if motivo else ""}')
+        self._conectado = False
+
+    def _somar_pendentes(self, quantidade):
+        with self._lock_pendentes:
+            self._pendentes += quantidade
+
+    def registrar(self, aluno_id, tipo, foto_bytes=None, momento=None, aguardando_foto=False):
+        """Anexa o registro ao diário e acorda a thread de gravação. Retorna o uid do registro.
+
+        Com `aguardando_foto`, o registro (e os seguintes) só é gravado no
+        banco depois de `anexar_foto()`.
+        """
+        momento = momento or datetime.datetime.now().replace(microsecond=0)
+        uid = str(uuid.uuid4())
+        # Só registros feitos sem acesso ao banco passam pelas regras de conflito
+        self.armazem.anexar(uid, aluno_id, tipo, momento, foto_bytes, offline=not self.online,
+                            aguardando_foto=aguardando_foto)
+        self._somar_pendentes(1)
+        self._novo.set()
+        return uid
+
+    def anexar_foto(self, uid, foto_bytes):
+        """Completa com a foto (ou None, sem foto) um registro feito com `aguardando_foto`."""
+        self.armazem.anexar_foto(uid, foto_bytes)
+        self._novo.set()
+
+    def iniciar(self):
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop_gravacao, name='gravador-registros', daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop_gravacao(self):
+        espera = ESPERA_INICIAL
+        while not self._parar.is_set():
+            try:
+                while self.gravar_lote():
+                    if self._parar.is_set():
+                        return
+                # Diário vazio: sonda o banco, para que `online` não dependa de haver o que gravar
+                verificar_conexao()
+                self._contato()
+                espera = ESPERA_INICIAL
+                if self._novo.wait(INTERVALO_VERIFICACAO):
+                    self._novo.clear()
+            except ERROS_CONEXAO as e:
+                self.marcar_offline(e)
+                self._parar.wait(espera)
+                espera = min(espera * 2, ESPERA_MAXIMA)
+            except Exception as e:
+                print(f'Erro na gravação de registros: {e}')
+                traceback.print_exc()
+                self._parar.wait(espera)
+
+    def gravar_lote(self):
+        """Grava o próximo lote do diário. Retorna False se o diário estava vazio."""
+        lote = self.armazem.pendentes(self.tamanho_lote)
+        if not lote:
+            return False
+        try:
+            descartados = gravar_registros(lote)
+        except ERROS_CONEXAO:
+            raise
+        except mariadb.Error:
+            self._gravar_um_a_um(lote)
+            return True
+
+        self._concluir(lote, descartados)
+        return True
+
+    def _concluir(self, lote, descartados):
+        self._contato()
+        motivos = dict(descartados)
+        conflitos = [(r['seq'], motivos[r['uid']]) for r in lote if r['uid'] in motivos]
+        for registro in lote:
+            if registro['uid'] in motivos:
+                print(f"Registro descartado ({motivos[registro['uid']]}): aluno {registro['aluno_id']}, "
+                      f"{registro['tipo']} de {registro['momento']:%d/%m/%Y %H:%M:%S} (uid {registro['uid']})")
+        self.armazem.descartar(conflitos)
+        self.descartados += len(conflitos)
+        self.armazem.confirmar([r['seq'] for r in lote if r['uid'] not in motivos])
+        self._somar_pendentes(-len(lote))
+
+    def _gravar_um_a_um(self, lote):
+        for registro in lote:
+            try:
+                self._concluir([registro], gravar_registros([registro]))
+            except ERROS_CONEXAO:
+                raise
+            except mariadb.Error as e:
+                print(f"Registro {registro['uid']} recusado pelo banco: {e}")
+                if self.armazem.falhou(registro['seq'], e):
+                    self._somar_pendentes(-1)  # Separado em `rejeitados`
+                # Os registros seguintes esperam: a ordem entrada → saída importa
+                self._parar.wait(ESPERA_INICIAL)
+                return
+
+    def parar(self, timeout=10.0):
+        """Interrompe a gravação e espera o lote em andamento (até `timeout` segundos)."""
+        self._parar.set()
+        self._novo.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
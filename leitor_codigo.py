@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from pyzbar import pyzbar
+from pyzbar.pyzbar import ZBarSymbol
+
+# Região onde o cartão costuma ser apresentado, em frações do frame (x0, y0, x1, y1)
+ROI_PADRAO = (0.2, 0.2, 0.8, 0.8)
+# Tempo (segundos) sem ver um cartão antes que ele possa ser lido de novo.
+# Para o cartão aceito, conta a partir do momento em que a tela é limpa e a
+# leitura recomeça (a captura da foto pode levar mais que isso)
+COOLDOWN_LEITURA = 10.0
+# Cartões lembrados ao mesmo tempo (os vistos há mais tempo saem primeiro)
+MAX_LEITURAS_RECENTES = 256
+
+
+def _decodificar(imagem):
+    return pyzbar.decode(imagem, symbols=[ZBarSymbol.CODE128])
+
+
+class LocalizadorCodigoBarras:
+    """Procura o código de barras começando pelas regiões mais baratas do frame.
+
+    Se um código foi lido recentemente, a busca começa numa margem ao redor da
+    última posição; caso contrário, na ROI configurada. Essas regiões são
+    varridas na cópia reduzida em tons de cinza do ContextoFrame (e a região
+    rastreada também em resolução cheia, por ser pequena). A cada `intervalo_varredura_completa`
+    frames o frame inteiro é varrido, para achar cartões fora da ROI.
+    """
+
+    def __init__(self, roi=ROI_PADRAO, escala=0.5, margem_rastreio=0.5,
+                 intervalo_varredura_completa=15, max_falhas_rastreio=10):
+        self.roi = roi
+        self.escala = escala
+        self.margem_rastreio = margem_rastreio
+        self.intervalo_varredura_completa = intervalo_varredura_completa
+        self.max_falhas_rastreio = max_falhas_rastreio
+        self._lock = threading.Lock()
+        self._frames = 0
+        self._ultima_regiao = None  # (x, y, w, h) em coordenadas do frame completo
+        self._falhas = 0
+
+    def localizar(self, contexto):
+        """Retorna o conteúdo dos códigos Code 128 encontrados no frame do ContextoFrame."""
+        with self._lock:
+            self._frames += 1
+            varredura_completa = self._frames % self.intervalo_varredura_completa == 0
+            regiao_rastreada = self._ultima_regiao
+
+        altura, largura = contexto.shape[:2]
+        if varredura_completa:
+            tentativas = [((0, 0, largura, altura), 1.0)]
+        elif regiao_rastreada is not None:
+            regiao = self._expandir(regiao_rastreada, largura, altura)
+            tentativas = [(regiao, self.escala), (regiao, 1.0)]
+        else:
+            tentativas = [(self._regiao_roi(largura, altura), self.escala)]
+
+        for regiao, escala in tentativas:
+            barcodes = self._decodificar_regiao(contexto, regiao, escala)
+            if barcodes:
+                self._registrar_sucesso(barcodes[0].rect, regiao, escala)
+                return [barcode.data.decode('utf-8') for barcode in barcodes]
+
+        self._registrar_falha()
+        return []
+
+    def _decodificar_regiao(self, contexto, regiao, escala):
+        x, y, w, h = regiao
+        cinza = contexto.gray_reduzido(escala)
+        x0, y0 = int(x * escala), int(y * escala)
+        x1, y1 = int((x + w) * escala), int((y + h) * escala)
+        return _decodificar(cinza[y0:y1, x0:x1])
+
+    def _regiao_roi(self, largura, altura):
+        x0, y0, x1, y1 = self.roi
+        x, y = int(x0 * largura), int(y0 * altura)
+        return x, y, int(x1 * largura) - x, int(y1 * altura) - y
+
+    def _expandir(self, regiao, largura, altura):
+        x, y, w, h = regiao
+        # Para códigos lineares a zbar pode devolver um retângulo bem baixo,
+        # então a margem usa o maior lado nas duas direções
+        margem = int(max(w, h) * self.margem_rastreio)
+        x0, y0 = max(0, x - margem), max(0, y - margem)
+        x1, y1 = min(largura, x + w + margem), min(altura, y + h + margem)
+        return x0, y0, x1 - x0, y1 - y0
+
+    def _registrar_sucesso(self, rect, regiao, escala):
+        left, top, width, height = rect
+        x, y = regiao[:2]
+        encontrado = (x + int(left / escala), y + int(top / escala),
+                      max(1, int(width / escala)), max(1, int(height / escala)))
+        with self._lock:
+            self._ultima_regiao = encontrado
+            self._falhas = 0
+
+    def _registrar_falha(self):
+        with self._lock:
+            if self._ultima_regiao is None:
+                return
+            self._falhas += 1
+            if self._falhas >= self.max_falhas_rastreio:
+                self._ultima_regiao = None
+                self._falhas = 0
+
+
+class CacheLeiturasRecentes:
+    """Lembra os cartões lidos recentemente para descartar leituras repetidas.
+
+    Um cartão mantido na frente da câmera é decodificado de novo a cada
+    frame. Enquanto ele continuar sendo visto, cada leitura renova o prazo,
+    então só volta a valer depois de ficar `cooldown` segundos fora da
+    câmera. Usado só na thread da interface, por isso não tem lock.
+    """
+
+    def __init__(self, cooldown=COOLDOWN_LEITURA, max_itens=MAX_LEITURAS_RECENTES):
+        self.cooldown = cooldown
+        self.max_itens = max_itens
+        self._vistos = OrderedDict()  # código -> última vez visto (time.monotonic), do mais antigo ao mais recente
+        self.descartadas = 0
+
+    def _expirar(self, agora):
+        while self._vistos:
+            codigo, visto = next(iter(self._vistos.items()))
+            if agora - visto < self.cooldown and len(self._vistos) <= self.max_itens:
+                break
+            self._vistos.popitem(last=False)
+
+    def repetida(self, codigo, agora=None):
+        """True se o código foi visto há menos de `cooldown` segundos (e renova o prazo)."""
+        agora = time.monotonic() if agora is None else agora
+        self._expirar(agora)
+        if codigo not in self._vistos:
+            return False
+        self._vistos[codigo] = agora
+        self._vistos.move_to_end(codigo)
+        self.descartadas += 1
+        return True
+
+    def marcar(self, codigo, agora=None):
+        """Registra uma leitura aceita."""
+        agora = time.monotonic() if agora is None else agora
+        self._vistos[codigo] = agora
+        self._vistos.move_to_end(codigo)
+        self._expirar(agora)
+
+    def __len__(self):
+        return len(self._vistos)
+
+
+class DecodificadorCodigoBarras(QObject):
+    """Decodifica códigos de barras num pool de threads, fora da thread da interface.
+
+    O pyzbar chama a zbar via ctypes, que libera o GIL durante a decodificação,
+    então threads bastam para usar vários núcleos. Quando todas as threads estão
+    ocupadas o frame é descartado em vez de enfileirado, para que a leitura
+    sempre trabalhe sobre a imagem mais recente.
+    """
+
+    codigo_lido = pyqtSignal(str)
+
+    def __init__(self, localizador=None, max_threads=None, parent=None):
+        super().__init__(parent)
+        self.localizador = localizador or LocalizadorCodigoBarras()
+        self.max_threads = max_threads or max(1, (os.cpu_count() or 2) - 1)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_threads,
+                                            thread_name_prefix='decodificador')
+        self._vagas = threading.Semaphore(self.max_threads)
+        self.frames_descartados = 0
+
+    def enviar(self, contexto):
+        """Agenda a decodificação do ContextoFrame. Retorna False se o frame foi descartado."""
+        if not self._vagas.acquire(blocking=False):
+            self.frames_descartados += 1
+            return False
+        try:
+            future = self._executor.submit(self.localizador.localizar, contexto)
+        except RuntimeError:
+            # Executor já encerrado (janela fechando)
+            self._vagas.release()
+            return False
+        future.add_done_callback(self._finalizar)
+        return True
+
+    def _finalizar(self, future):
+        self._vagas.release()
+        if future.cancelled():
+            return
+        try:
+            codigos = future.result()
+        except Exception as e:
+            print(f'Erro ao decodificar código de barras: {e}')
+            traceback.print_exc()
+            return
+        # O sinal é entregue na thread da interface via conexão enfileirada
+        for codigo in codigos:
+            self.codigo_lido.emit(codigo)
+
+    def encerrar(self):
+        """Cancela decodificações pendentes e encerra o pool."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
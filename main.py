@@ -1,4 +1,5 @@
 import sys
+import time
 import traceback
 from PyQt5.QtWidgets import (QLabel, QVBoxLayout, QWidget, QApplication, QHBoxLayout, 
                              QFrame, QGridLayout, QPushButton, QTabWidget, QTableWidget, 
@@ -7,11 +8,22 @@ from PyQt5.QtWidgets import (QLabel, QVBoxLayout, QWidget, QApplication, QHBoxLa
 from PyQt5.QtGui import QPixmap, QColor, QPalette, QImage, QFont, QIcon
 from PyQt5.QtCore import Qt, QTimer, QDate
 import cv2
-from pyzbar import pyzbar
-from db_utils import (buscar_aluno_por_id, registrar_entrada_ou_saida, aluno_com_entrada_aberta,
-                      relatorio_diario, relatorio_semanal, relatorio_entradas_por_turno,
-                      dados_grafico_frequencia_tempo, obter_estatisticas_gerais, relatorio_por_periodo)
-from face_overlay import detectar_rosto_e_overlay
+from db_utils import (relatorio_diario, relatorio_semanal, relatorio_entradas_por_turno,
+                      dados_grafico_frequencia_tempo, relatorio_por_periodo)
+from face_overlay import detectar_rosto_e_overlay, criar_detector
+from camera import CapturaCamera
+from contexto_frame import ContextoFrame
+from movimento import PortaoMovimento
+from leitor_codigo import DecodificadorCodigoBarras, CacheLeiturasRecentes
+from preview import RenderizadorPreview
+from governador import GovernadorTaxa
+from cache_alunos import CacheAlunos
+from entradas_abertas import EntradasAbertas
+from estatisticas import ServicoEstatisticas
+from armazem_local import ArmazemLocal
+from gravador import GravadorRegistros
+from fotos import CodificadorFotos, recortar_rosto
+from auditoria_fotos import JanelaAuditoriaFotos
 import numpy as np
 from datetime import datetime, timedelta
 import mariadb
@@ -36,18 +48,79 @@ def excecao_nao_tratada(exctype, value, tb):
 
 sys.excepthook = excecao_nao_tratada
 
+# Tempo (em segundos) que o rosto deve ficar centralizado antes da foto
+TEMPO_CENTRALIZACAO = 1.0
+
 class ModernMainWindow(QWidget):
     def __init__(self):
         super().__init__()
         # Configurações da Câmera e Timer
-        self.cap = cv2.VideoCapture(0)
+        # A captura roda em thread própria; o timer só consome o frame mais recente
+        self.camera = CapturaCamera(0).iniciar()
+        self.ultimo_numero_frame = None
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.atualizar_frame)
-        self.timer.start(30) # ~33 FPS
+        self.timer.start(15)
+
+        # Ajusta o intervalo do timer ao custo medido de cada estágio
+        self.governador = GovernadorTaxa()
+        self.timer_fps = QTimer(self)
+        self.timer_fps.timeout.connect(self.atualizar_fps)
+        self.timer_fps.start(1000)
+
+        # Decodificação dos códigos de barras em pool de threads
+        self.decodificador = DecodificadorCodigoBarras(parent=self)
+        self.decodificador.codigo_lido.connect(self.processar_codigo_lido)
+        self.leituras_recentes = CacheLeiturasRecentes()
+
+        # Com a cena parada (ninguém no quiosque) leitura e detecção ficam suspensas
+        self.portao_movimento = PortaoMovimento()
+
+        # Registros vão para o diário local e são gravados no banco em segundo plano;
+        # o mesmo arquivo guarda cópias do cadastro e das entradas abertas (modo offline)
+        self.armazem = ArmazemLocal()
+        self.gravador = GravadorRegistros(self.armazem).iniciar()
+        # Fotos codificadas fora da thread da interface (codec/qualidade em fotos.py)
+        self.codificador_fotos = CodificadorFotos(self.gravador)
+
+        # Cadastro de alunos em memória: a leitura do cartão não consulta o banco
+        self.cache_alunos = CacheAlunos(self.armazem)
+        # Carga a partir da cópia local: o banco não respondeu, então os
+        # registros já começam marcados como offline
+        try:
+            if not self.cache_alunos.carregar():
+                self.gravador.marcar_offline()
+        except Exception as e:
+            print(f"Erro ao carregar cache de alunos: {e}")
+            self.gravador.marcar_offline()
+        self.cache_alunos.iniciar_atualizacao_periodica()
+
+        # Alunos com entrada aberta: decide entrada/saída sem consultar o banco
+        self.entradas_abertas = EntradasAbertas(self.armazem)
+        try:
+            if not self.entradas_abertas.carregar():
+                self.gravador.marcar_offline()
+        except Exception as e:
+            print(f"Erro ao carregar entradas abertas: {e}")
+            self.gravador.marcar_offline()
+        self.entradas_abertas.iniciar_reconciliacao_periodica()
+
+        # Contadores do cabeçalho em memória: o registro não dispara consultas de estatística
+        self.estatisticas = ServicoEstatisticas(self.cache_alunos, self.armazem)
+        try:
+            self.estatisticas.carregar()
+        except Exception as e:
+            print(f"Erro ao carregar estatísticas: {e}")
+        self.estatisticas.iniciar_reconciliacao_periodica()
+        # Reflete no cabeçalho as reconciliações e a virada do dia
+        self.timer_estatisticas = QTimer(self)
+        self.timer_estatisticas.timeout.connect(self.atualizar_estatisticas)
+        self.timer_estatisticas.start(5000)
 
         # Variáveis de estado
         self.reset_state()
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        # Detector de rosto configurável (ver DETECTORES em face_overlay.py)
+        self.detector_rosto = criar_detector()
         
         # Inicialização da UI
         self.setup_ui()
@@ -58,7 +131,7 @@ class ModernMainWindow(QWidget):
         self.aluno_atual = None
         self.foto_aluno = None
         self.capturando_foto = False
-        self.tempo_centralizado = 0
+        self.inicio_centralizado = None
 
     def setup_ui(self):
         """Cria e organiza todos os widgets da interface."""
@@ -110,8 +183,9 @@ class ModernMainWindow(QWidget):
         self.stats_alunos = QLabel("Alunos: 0", self)
         self.stats_hoje = QLabel("Hoje: 0", self)
         self.stats_mes = QLabel("Mês: 0", self)
+        self.stats_conexao = QLabel("🟢 Online", self)
         
-        for stat in [self.stats_alunos, self.stats_hoje, self.stats_mes]:
+        for stat in [self.stats_alunos, self.stats_hoje, self.stats_mes, self.stats_conexao]:
             stat.setObjectName("statLabel")
             stats_layout.addWidget(stat)
         
@@ -163,14 +237,15 @@ class ModernMainWindow(QWidget):
         video_layout = QVBoxLayout(video_panel)
         video_layout.setContentsMargins(15, 15, 15, 15)
         
-        video_title = QLabel("Câmera", self)
-        video_title.setObjectName("panelTitle")
-        video_layout.addWidget(video_title)
+        self.video_title = QLabel("Câmera", self)
+        self.video_title.setObjectName("panelTitle")
+        video_layout.addWidget(self.video_title)
         
         self.video_label = QLabel('Iniciando câmera...', self)
         self.video_label.setObjectName("videoLabel")
         self.video_label.setAlignment(Qt.AlignCenter)
         video_layout.addWidget(self.video_label)
+        self.renderizador_preview = RenderizadorPreview(self.video_label, parent=self)
         
         # Painel de Informações
         info_panel = QFrame(self)
@@ -265,6 +340,10 @@ class ModernMainWindow(QWidget):
         self.btn_relatorio_diario.setObjectName("reportButton")
         self.btn_relatorio_diario.clicked.connect(self.gerar_relatorio_diario)
 
+        self.btn_auditoria_fotos = QPushButton("Auditoria de Fotos", self)
+        self.btn_auditoria_fotos.setObjectName("reportButton")
+        self.btn_auditoria_fotos.clicked.connect(self.abrir_auditoria_fotos)
+
         filter_layout.addWidget(QLabel("Data:"))
         filter_layout.addWidget(self.date_edit)
         filter_layout.addWidget(QLabel("Início:"))
@@ -274,6 +353,7 @@ class ModernMainWindow(QWidget):
         filter_layout.addWidget(self.btn_relatorio_turno)
         filter_layout.addWidget(self.btn_relatorio_periodo)
         filter_layout.addWidget(self.btn_relatorio_diario)
+        filter_layout.addWidget(self.btn_auditoria_fotos)
         filter_layout.addStretch()
 
         reports_layout.addLayout(filter_layout)
@@ -785,10 +865,19 @@ class ModernMainWindow(QWidget):
     def atualizar_estatisticas(self):
         """Atualiza as estatísticas no header."""
         try:
-            stats = obter_estatisticas_gerais()
+            stats = self.estatisticas.valores()
             self.stats_alunos.setText(f"Alunos: {stats.get('total_alunos', 0)}")
             self.stats_hoje.setText(f"Hoje: {stats.get('registros_hoje', 0)}")
             self.stats_mes.setText(f"Mês: {stats.get('registros_mes', 0)}")
+            if self.gravador.online:
+                conexao = "🟢 Online"
+            else:
+                conexao = f"🔴 Offline ({self.gravador.pendentes} pendentes)"
+            if self.gravador.descartados:
+                conexao += f" ⚠️ {self.gravador.descartados} descartados"
+                self.stats_conexao.setToolTip("Registros descartados por conflito com outros quiosques: "
+                                              "veja a tabela conflitos em refeitorio_local.db")
+            self.stats_conexao.setText(conexao)
         except Exception as e:
             print(f"Erro ao atualizar estatísticas: {e}")
             # Fallback para valores padrão
@@ -799,98 +888,133 @@ class ModernMainWindow(QWidget):
     def atualizar_frame(self):
         """Função principal executada pelo Timer para processar cada frame da câmera."""
         try:
-            ret, frame = self.cap.read()
-            if not ret:
-                self.set_status_message("Falha ao capturar frame da webcam", "error")
+            numero_frame, frame = self.camera.ultimo_frame()
+            if frame is None:
+                if self.camera.falhando():
+                    self.set_status_message("Falha ao capturar frame da webcam", "error")
                 return
+            if numero_frame == self.ultimo_numero_frame:
+                return  # Nenhum frame novo desde o último tick
+            self.ultimo_numero_frame = numero_frame
 
-            processed_frame = frame.copy()
+            # Derivados do frame (tons de cinza, reduções) são compartilhados entre os estágios
+            contexto = ContextoFrame(numero_frame, frame)
+            processed_frame = frame
+            with self.governador.medir('movimento'):
+                cena_ativa = self.portao_movimento.deve_processar(contexto)
 
             # Se um aluno já foi lido, passa para a fase de captura de foto
             if self.capturando_foto:
-                processed_frame, centralizado, bbox = detectar_rosto_e_overlay(frame, self.face_cascade)
-                
-                # Adicionar contador de tempo para centralização
-                if not hasattr(self, 'tempo_centralizado'):
-                    self.tempo_centralizado = 0
-                
+                # Um rosto já centralizado continua sendo acompanhado mesmo com a cena parada
+                executar_deteccao = cena_ativa or self.inicio_centralizado is not None
+                with self.governador.medir('rosto'):
+                    processed_frame, centralizado, bbox = detectar_rosto_e_overlay(contexto, self.detector_rosto,
+                                                                                   executar_deteccao)
+
                 if centralizado:
-                    self.tempo_centralizado += 1
-                    # Aguardar 1 segundo (30 frames a 30 FPS) para confirmar centralização
-                    if self.tempo_centralizado >= 30:
-                        x, y, w, h = bbox
-                        self.foto_aluno = frame[y:y+h, x:x+w]
+                    if self.inicio_centralizado is None:
+                        self.inicio_centralizado = time.monotonic()
+                    # Aguardar TEMPO_CENTRALIZACAO segundos (relógio, não frames) para confirmar centralização
+                    if time.monotonic() - self.inicio_centralizado >= TEMPO_CENTRALIZACAO:
+                        # Recorte com margem, na resolução canônica das fotos (fotos.py)
+                        self.foto_aluno = recortar_rosto(frame, bbox)
                         self.set_status_message("🎉 FOTO CAPTURADA! Registrando entrada...", "success")
                         self.capturando_foto = False
-                        self.tempo_centralizado = 0
+                        self.inicio_centralizado = None
                         
                         # Mostrar a foto capturada
                         self.mostrar_foto_capturada()
                         
-                        # Registrar entrada no banco
+                        # Registrar entrada (diário local; o banco é gravado em segundo plano)
                         if self.aluno_atual:
-                            tipo, timestamp = registrar_entrada_ou_saida(self.aluno_atual['id'], self.foto_aluno)
+                            tipo = 'entrada'
+                            timestamp = self.codificador_fotos.registrar(self.aluno_atual['id'], tipo,
+                                                                         self.foto_aluno)
+                            self.entradas_abertas.registrar(self.aluno_atual['id'], tipo)
+                            self.estatisticas.registrar(self.aluno_atual['id'], tipo, timestamp)
                             self.set_status_message(f"{tipo.title()} registrada com sucesso!", "success")
                             self.atualizar_estatisticas()
                         
                         QTimer.singleShot(3000, self.reset_and_clear)
                 else:
-                    self.tempo_centralizado = 0
-            else:
-                # Se não, continua tentando ler o código de barras
-                barcodes = pyzbar.decode(frame)
-                if barcodes:
-                    for barcode in barcodes:
-                        if not self.codigo_lido:
-                            barcode_data = barcode.data.decode('utf-8')
-                            self.codigo_lido = barcode_data
-                            
-                            aluno = buscar_aluno_por_id(self.codigo_lido)
-                            if aluno:
-                                self.aluno_atual = aluno
-                                self.nome_valor.setText(aluno.get('nome', 'N/A'))
-                                self.matricula_valor.setText(aluno.get('matricula', 'N/A'))
-                                self.curso_valor.setText(aluno.get('curso', 'N/A'))
-                                
-                                # Verificar se é entrada ou saída
-                                registro_aberto = aluno_com_entrada_aberta(aluno['id'])
-                                if registro_aberto:
-                                    # É uma saída - registrar diretamente sem foto
-                                    tipo, timestamp = registrar_entrada_ou_saida(aluno['id'], None)
-                                    self.set_status_message(f"Saída registrada com sucesso!", "success")
-                                    self.atualizar_estatisticas()
-                                    QTimer.singleShot(3000, self.reset_and_clear)
-                                else:
-                                    # É uma entrada - capturar foto
-                                    self.set_status_message("Aluno encontrado! Encaixe o rosto para a foto.", "success")
-                                    self.capturando_foto = True
-                            else:
-                                self.set_status_message(f"Aluno com ID '{self.codigo_lido}' não encontrado!", "error")
-                                self.clear_student_info()
-                                QTimer.singleShot(3000, self.reset_and_clear)
-                            break
+                    self.inicio_centralizado = None
+            elif not self.codigo_lido and cena_ativa:
+                # Se não, continua tentando ler o código de barras (fora da thread da interface)
+                self.decodificador.enviar(contexto)
 
             # Exibe o frame processado na tela
-            self.display_image(processed_frame)
+            with self.governador.medir('exibicao'):
+                self.display_image(processed_frame, numero_frame)
+
+            self.governador.registrar_frame(numero_frame)
+            intervalo = self.governador.intervalo_ms()
+            if intervalo != self.timer.interval():
+                self.timer.setInterval(intervalo)
 
         except Exception as e:
             print(f"Erro em atualizar_frame: {e}")
             traceback.print_exc()
 
+    def processar_codigo_lido(self, barcode_data):
+        """Trata um código de barras decodificado pelo pool de leitura."""
+        try:
+            # Cartão ainda na frente da câmera (ou lido há pouco): nada de nova busca/registro
+            if self.leituras_recentes.repetida(barcode_data):
+                return
+            # Resultados que chegam depois de um código já aceito são ignorados
+            if self.codigo_lido or self.capturando_foto:
+                return
+            self.leituras_recentes.marcar(barcode_data)
+            self.codigo_lido = barcode_data
+
+            aluno = self.cache_alunos.buscar(self.codigo_lido)
+            if aluno:
+                self.aluno_atual = aluno
+                self.nome_valor.setText(aluno.get('nome', 'N/A'))
+                self.matricula_valor.setText(aluno.get('matricula', 'N/A'))
+                self.curso_valor.setText(aluno.get('curso', 'N/A'))
+
+                # Verificar se é entrada ou saída
+                if self.entradas_abertas.esta_dentro(aluno['id']):
+                    # É uma saída - registrar diretamente sem foto
+                    tipo = 'saida'
+                    timestamp = self.codificador_fotos.registrar(aluno['id'], tipo)
+                    self.entradas_abertas.registrar(aluno['id'], tipo)
+                    self.estatisticas.registrar(aluno['id'], tipo, timestamp)
+                    self.set_status_message(f"{tipo.title()} registrada com sucesso!", "success")
+                    self.atualizar_estatisticas()
+                    QTimer.singleShot(3000, self.reset_and_clear)
+                else:
+                    # É uma entrada - capturar foto
+                    self.set_status_message("Aluno encontrado! Encaixe o rosto para a foto.", "success")
+                    self.detector_rosto.reiniciar()
+                    self.capturando_foto = True
+            else:
+                self.set_status_message(f"Aluno com ID '{self.codigo_lido}' não encontrado!", "error")
+                self.clear_student_info()
+                QTimer.singleShot(3000, self.reset_and_clear)
+
+        except Exception as e:
+            print(f"Erro em processar_codigo_lido: {e}")
+            traceback.print_exc()
+
+    def atualizar_fps(self):
+        """Mostra o FPS efetivo do processamento no título do painel de vídeo."""
+        self.video_title.setText(f"Câmera ({self.governador.fps_efetivo:.0f} FPS)")
+
     def reset_and_clear(self):
         """Função para limpar os dados e o status para uma nova leitura."""
+        # Durante a captura da foto não há decodificação que renove o prazo do
+        # cartão: ele passa a contar a partir de agora, quando a leitura volta
+        if self.codigo_lido:
+            self.leituras_recentes.marcar(self.codigo_lido)
         self.reset_state()
         self.clear_student_info()
         self.set_status_message("Aguardando leitura do código de barras...")
 
-    def display_image(self, img):
-        """Converte uma imagem do OpenCV para QPixmap e exibe no QLabel."""
-        rgb_image = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_image.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        pixmap = QPixmap.fromImage(qt_image)
-        self.video_label.setPixmap(pixmap.scaled(self.video_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+    def display_image(self, img, numero_frame=None):
+        """Exibe uma imagem do OpenCV (BGR) no QLabel do vídeo."""
+        self.renderizador_preview.exibir(img, numero_frame)
 
     def mostrar_foto_capturada(self):
         """Exibe a foto capturada em uma janela popup."""
@@ -1141,6 +1265,29 @@ class ModernMainWindow(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Erro", f"Erro ao gerar relatório: {e}")
 
+    def abrir_auditoria_fotos(self):
+        """Abre a grade de fotos das entradas do dia selecionado."""
+        try:
+            data_selecionada = self.date_edit.date().toPyDate()
+
+            turnos_selecionados = [nome for cb, nome in ((self.cb_cafe_manha, 'Café da Manhã'),
+                                                         (self.cb_almoco, 'Almoço'),
+                                                         (self.cb_cafe_tarde, 'Café da Tarde'),
+                                                         (self.cb_janta, 'Janta')) if cb.isChecked()]
+            # Se nenhum turno selecionado, usar todos
+            if not turnos_selecionados:
+                turnos_selecionados = ['Café da Manhã', 'Almoço', 'Café da Tarde', 'Janta']
+
+            registros = relatorio_diario(data_selecionada, turnos_filtro=turnos_selecionados)
+            if not registros:
+                QMessageBox.information(self, "Auditoria de Fotos", "Nenhum registro encontrado para a data selecionada.")
+                return
+
+            JanelaAuditoriaFotos(registros, data_selecionada, self).exec_()
+
+        except Exception as e:
+            QMessageBox.critical(self, "Erro", f"Erro ao abrir auditoria de fotos: {e}")
+
     def gerar_grafico_frequencia(self):
         """Gera gráfico de frequência visual em janela separada."""
         try:
@@ -1291,7 +1438,18 @@ class ModernMainWindow(QWidget):
 
     def closeEvent(self, event):
         """Libera a câmera ao fechar a janela."""
-        self.cap.release()
+        self.timer.stop()
+        self.timer_fps.stop()
+        self.timer_estatisticas.stop()
+        self.estatisticas.parar()
+        self.codificador_fotos.encerrar()
+        self.gravador.parar()
+        self.cache_alunos.parar()
+        self.entradas_abertas.parar()
+        # Só depois que as threads que usam o diário e as cópias locais terminaram
+        self.armazem.fechar()
+        self.decodificador.encerrar()
+        self.camera.parar()
         super().closeEvent(event)
 
 if __name__ == '__main__':
@@ -0,0 +1,409 @@
+import argparse
+import datetime
+import sys
+import traceback
+
+from db_utils import (
+    conectar_db,
+    modo_script,
+    consulta_entradas_por_turno,
+    consulta_frequencia_por_dia,
+    consulta_frequencia_por_hora,
+    consulta_relatorio_diario,
+    consultas_estatisticas_gerais,
+    reconstruir_resumo,
+    SQL_GRAVAR_SAIDA,
+    SQL_LISTAR_ENTRADAS_ABERTAS,
+    TURNOS,
+)
+
+# Fotos copiadas por transação ao mover as fotos para fotos_refeitorio
+LOTE_MIGRACAO_FOTOS = 1000
+# Combinações dos turnos 1 a 5 (máscaras 1 a 31) usadas na carga de resumo_turnos
+_MASCARAS_TURNOS = ' UNION ALL '.join(f'SELECT {m} AS mascara' for m in range(1, 32))
+
+def _mover_fotos(conn, cursor):
+    """Move as fotos de registros_refeitorio.foto para fotos_refeitorio, em lotes por id.
+
+    Cada lote é confirmado sozinho e só toca em linhas que ainda têm foto,
+    então a migração pode ser interrompida e executada de novo.
+    """
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'registros_refeitorio' AND COLUMN_NAME = 'foto'
+        """)
+    if not cursor.fetchone()[0]:
+        return
+    cursor.execute('SELECT COALESCE(MAX(id), 0) FROM registros_refeitorio')
+    maior_id = cursor.fetchone()[0]
+    for inicio in range(0, maior_id + 1, LOTE_MIGRACAO_FOTOS):
+        intervalo = (inicio, inicio + LOTE_MIGRACAO_FOTOS)
+        cursor.execute("""
+            INSERT IGNORE INTO fotos_refeitorio (hash, dados)
+            SELECT SHA2(foto, 256), foto FROM registros_refeitorio
+            WHERE id >= ? AND id < ? AND foto IS NOT NULL
+            """, intervalo)
+        cursor.execute("""
+            UPDATE registros_refeitorio SET foto_hash = SHA2(foto, 256), foto = NULL
+            WHERE id >= ? AND id < ? AND foto IS NOT NULL
+            """, intervalo)
+        conn.commit()
+        print(f'  fotos movidas até o registro {min(intervalo[1] - 1, maior_id)} de {maior_id}')
+
+# Cada migração é (versão, descrição, comandos SQL). As versões são aplicadas
+# em ordem crescente, uma única vez por banco, e registradas em schema_versao.
+# Migrações já publicadas não devem ser alteradas: mudanças novas entram no fim.
+# Um comando também pode ser uma função (conn, cursor), para migrar dados em lotes.
+MIGRACOES = [
+    (1, 'Marcador de alteração do cadastro de alunos', [
+        """ALTER TABLE alunos ADD COLUMN IF NOT EXISTS
+            atualizado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP""",
+        'CREATE INDEX IF NOT EXISTS idx_alunos_atualizado_em ON alunos (atualizado_em)',
+    ]),
+    (2, 'Índices das consultas de entrada aberta e dos relatórios', [
+        # Entrada aberta de um aluno (saída em db_utils.gravar_registros), já na ordem de hora_entrada
+        """CREATE INDEX IF NOT EXISTS idx_registros_aluno_saida
+            ON registros_refeitorio (aluno_id, hora_saida, hora_entrada)""",
+        # Todas as entradas abertas (listar_entradas_abertas), sem ler a tabela
+        """CREATE INDEX IF NOT EXISTS idx_registros_saida_aluno
+            ON registros_refeitorio (hora_saida, aluno_id)""",
+        # Relatórios por intervalo de hora_entrada; aluno_id cobre o COUNT(DISTINCT aluno_id)
+        """CREATE INDEX IF NOT EXISTS idx_registros_entrada_aluno
+            ON registros_refeitorio (hora_entrada, aluno_id)""",
+    ]),
+    (3, 'Procedure registrar_entrada_ou_saida', [
+        # A linha do aluno é travada (FOR UPDATE), então leituras simultâneas do
+        # mesmo cartão em quiosques diferentes são serializadas: a primeira registra
+        # a entrada e a segunda encontra a entrada aberta e registra a saída.
+        """CREATE OR REPLACE PROCEDURE registrar_entrada_ou_saida(
+            IN p_aluno_id INT,
+            IN p_foto LONGBLOB,
+            IN p_agora DATETIME
+        )
+        BEGIN
+            DECLARE v_existe INT DEFAULT 0;
+            DECLARE v_registro_id INT DEFAULT NULL;
+            DECLARE v_tipo VARCHAR(10);
+            DECLARE EXIT HANDLER FOR SQLEXCEPTION
+            BEGIN
+                ROLLBACK;
+                RESIGNAL;
+            END;
+
+            START TRANSACTION;
+
+            SELECT COUNT(*) INTO v_existe FROM alunos WHERE id = p_aluno_id FOR UPDATE;
+            IF v_existe = 0 THEN
+                SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Aluno não encontrado';
+            END IF;
+
+            SET v_registro_id = (SELECT id FROM registros_refeitorio
+                                 WHERE aluno_id = p_aluno_id AND hora_saida IS NULL
+                                 ORDER BY hora_entrada DESC LIMIT 1);
+
+            IF v_registro_id IS NULL THEN
+                -- Não tem entrada aberta, registrar entrada (com foto)
+                INSERT INTO registros_refeitorio (aluno_id, foto, hora_entrada) VALUES (p_aluno_id, p_foto, p_agora);
+                SET v_registro_id = LAST_INSERT_ID();
+                SET v_tipo = 'entrada';
+            ELSE
+                -- Já tem entrada aberta, registrar saída (mantém a foto da entrada se não vier outra)
+                UPDATE registros_refeitorio SET hora_saida = p_agora, foto = COALESCE(p_foto, foto)
+                WHERE id = v_registro_id;
+                SET v_tipo = 'saida';
+            END IF;
+
+            COMMIT;
+
+            SELECT v_tipo AS tipo, p_agora AS momento, v_registro_id AS registro_id;
+        END""",
+    ]),
+    (4, 'Colunas geradas de data e turno da entrada', [
+        # Mesmos horários de db_utils.TURNOS, inclusivos; a ordem define o código do turno
+        """ALTER TABLE registros_refeitorio
+            ADD COLUMN IF NOT EXISTS data_entrada DATE AS (DATE(hora_entrada)) PERSISTENT,
+            ADD COLUMN IF NOT EXISTS turno TINYINT AS (CASE
+                WHEN TIME(hora_entrada) BETWEEN '09:30:00' AND '09:50:00' THEN 1
+                WHEN TIME(hora_entrada) BETWEEN '11:00:00' AND '12:50:00' THEN 2
+                WHEN TIME(hora_entrada) BETWEEN '14:30:00' AND '14:50:00' THEN 3
+                WHEN TIME(hora_entrada) BETWEEN '19:30:00' AND '20:40:00' THEN 4
+                ELSE 5
+            END) PERSISTENT""",
+        # Relatórios por dia e turno; aluno_id cobre o COUNT(DISTINCT aluno_id)
+        """CREATE INDEX IF NOT EXISTS idx_registros_data_turno
+            ON registros_refeitorio (data_entrada, turno, aluno_id)""",
+    ]),
+    (5, 'Resumo de refeições por dia e turno', [
+        # Turno 0 acumula o dia inteiro (db_utils.TURNO_DIA)
+        """CREATE TABLE IF NOT EXISTS resumo_refeicoes (
+            data_entrada DATE NOT NULL,
+            turno TINYINT NOT NULL,
+            total_entradas INT NOT NULL,
+            alunos_unicos INT NOT NULL,
+            PRIMARY KEY (data_entrada, turno)
+        )""",
+        # Conjunto exato de alunos que comeram em cada dia e turno
+        """CREATE TABLE IF NOT EXISTS resumo_alunos (
+            data_entrada DATE NOT NULL,
+            turno TINYINT NOT NULL,
+            aluno_id INT NOT NULL,
+            PRIMARY KEY (data_entrada, turno, aluno_id)
+        )""",
+        # Carga inicial com os registros existentes (rode com o sistema parado)
+        'DELETE FROM resumo_alunos',
+        'DELETE FROM resumo_refeicoes',
+        """INSERT INTO resumo_alunos (data_entrada, turno, aluno_id)
+            SELECT DISTINCT data_entrada, turno, aluno_id FROM registros_refeitorio WHERE hora_entrada IS NOT NULL
+            UNION
+            SELECT DISTINCT data_entrada, 0, aluno_id FROM registros_refeitorio WHERE hora_entrada IS NOT NULL""",
+        """INSERT INTO resumo_refeicoes (data_entrada, turno, total_entradas, alunos_unicos)
+            SELECT data_entrada, turno, COUNT(*), COUNT(DISTINCT aluno_id) FROM registros_refeitorio
+            WHERE hora_entrada IS NOT NULL GROUP BY data_entrada, turno
+            UNION ALL
+            SELECT data_entrada, 0, COUNT(*), COUNT(DISTINCT aluno_id) FROM registros_refeitorio
+            WHERE hora_entrada IS NOT NULL GROUP BY data_entrada""",
+        # Toda entrada gravada, por qualquer caminho, atualiza o resumo na mesma transação
+        """CREATE OR REPLACE TRIGGER registros_refeitorio_resumo
+        AFTER INSERT ON registros_refeitorio FOR EACH ROW
+        BEGIN
+            DECLARE v_novo_no_turno INT DEFAULT 0;
+            DECLARE v_novo_no_dia INT DEFAULT 0;
+
+            IF NEW.hora_entrada IS NOT NULL THEN
+                INSERT IGNORE INTO resumo_alunos (data_entrada, turno, aluno_id)
+                VALUES (NEW.data_entrada, NEW.turno, NEW.aluno_id);
+                SET v_novo_no_turno = ROW_COUNT();
+
+                INSERT IGNORE INTO resumo_alunos (data_entrada, turno, aluno_id)
+                VALUES (NEW.data_entrada, 0, NEW.aluno_id);
+                SET v_novo_no_dia = ROW_COUNT();
+
+                INSERT INTO resumo_refeicoes (data_entrada, turno, total_entradas, alunos_unicos)
+                VALUES (NEW.data_entrada, NEW.turno, 1, v_novo_no_turno),
+                       (NEW.data_entrada, 0, 1, v_novo_no_dia)
+                ON DUPLICATE KEY UPDATE
+                    total_entradas = total_entradas + 1,
+                    alunos_unicos = alunos_unicos + VALUES(alunos_unicos);
+            END IF;
+        END""",
+    ]),
+    (6, 'Identificador dos registros vindos do diário local', [
+        # uid da entrada e da saída: regravar o mesmo registro após uma queda não tem efeito
+        """ALTER TABLE registros_refeitorio
+            ADD COLUMN IF NOT EXISTS uid CHAR(36) NULL,
+            ADD COLUMN IF NOT EXISTS uid_saida CHAR(36) NULL""",
+        'CREATE UNIQUE INDEX IF NOT EXISTS uk_registros_uid ON registros_refeitorio (uid)',
+        'CREATE UNIQUE INDEX IF NOT EXISTS uk_registros_uid_saida ON registros_refeitorio (uid_saida)',
+    ]),
+    (7, 'Fotos em tabela própria, endereçadas pelo hash do conteúdo', [
+        # SHA-256 (hex) dos bytes codificados: fotos iguais são guardadas uma vez só
+        """CREATE TABLE IF NOT EXISTS fotos_refeitorio (
+            hash CHAR(64) PRIMARY KEY,
+            dados MEDIUMBLOB NOT NULL,
+            criado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )""",
+        'ALTER TABLE registros_refeitorio ADD COLUMN IF NOT EXISTS foto_hash CHAR(64) NULL',
+        'CREATE INDEX IF NOT EXISTS idx_registros_foto_hash ON registros_refeitorio (foto_hash)',
+        _mover_fotos,
+        # Todos os quiosques precisam estar na versão nova antes deste passo
+        'ALTER TABLE registros_refeitorio DROP COLUMN IF EXISTS foto',
+    ]),
+    (8, 'Miniaturas das fotos', [
+        # Preenchida na gravação; fotos antigas ganham a sua na primeira listagem (db_utils.carregar_miniaturas)
+        'ALTER TABLE fotos_refeitorio ADD COLUMN IF NOT EXISTS miniatura BLOB NULL',
+    ]),
+    (9, 'Alunos únicos por dia e combinação de turnos', [
+        # Máscara de bits dos turnos (bit turno-1, db_utils.mascara_turnos): o
+        # relatório filtrado por turnos lê uma linha por dia em vez do conjunto de alunos
+        """CREATE TABLE IF NOT EXISTS resumo_turnos (
+            data_entrada DATE NOT NULL,
+            mascara TINYINT NOT NULL,
+            alunos_unicos INT NOT NULL,
+            PRIMARY KEY (data_entrada, mascara)
+        )""",
+        # Carga inicial a partir de resumo_alunos (rode com o sistema parado)
+        'DELETE FROM resumo_turnos',
+        f"""INSERT INTO resumo_turnos (data_entrada, mascara, alunos_unicos)
+            SELECT a.data_entrada, m.mascara, COUNT(*)
+            FROM (
+                SELECT data_entrada, aluno_id, BIT_OR(1 << (turno - 1)) as turnos
+                FROM resumo_alunos WHERE turno <> 0
+                GROUP BY data_entrada, aluno_id
+            ) a
+            JOIN ({_MASCARAS_TURNOS}) m ON a.turnos & m.mascara <> 0
+            GROUP BY a.data_entrada, m.mascara""",
+        # O trigger passa a manter também resumo_turnos: na primeira entrada do
+        # aluno num turno do dia, soma 1 nas combinações com esse turno que não
+        # incluem nenhum turno em que ele já tinha comido
+        """CREATE OR REPLACE TRIGGER registros_refeitorio_resumo
+        AFTER INSERT ON registros_refeitorio FOR EACH ROW
+        BEGIN
+            DECLARE v_novo_no_turno INT DEFAULT 0;
+            DECLARE v_novo_no_dia INT DEFAULT 0;
+            DECLARE v_turnos_anteriores INT DEFAULT 0;
+            DECLARE v_bit INT DEFAULT 0;
+            DECLARE v_mascara INT DEFAULT 1;
+
+            IF NEW.hora_entrada IS NOT NULL THEN
+                INSERT IGNORE INTO resumo_alunos (data_entrada, turno, aluno_id)
+                VALUES (NEW.data_entrada, NEW.turno, NEW.aluno_id);
+                SET v_novo_no_turno = ROW_COUNT();
+
+                INSERT IGNORE INTO resumo_alunos (data_entrada, turno, aluno_id)
+                VALUES (NEW.data_entrada, 0, NEW.aluno_id);
+                SET v_novo_no_dia = ROW_COUNT();
+
+                INSERT INTO resumo_refeicoes (data_entrada, turno, total_entradas, alunos_unicos)
+                VALUES (NEW.data_entrada, NEW.turno, 1, v_novo_no_turno),
+                       (NEW.data_entrada, 0, 1, v_novo_no_dia)
+                ON DUPLICATE KEY UPDATE
+                    total_entradas = total_entradas + 1,
+                    alunos_unicos = alunos_unicos + VALUES(alunos_unicos);
+
+                IF v_novo_no_turno > 0 THEN
+                    -- Uma busca pela chave primária por turno
+                    SELECT COALESCE(BIT_OR(1 << (turno - 1)), 0) INTO v_turnos_anteriores
+                    FROM resumo_alunos
+                    WHERE data_entrada = NEW.data_entrada AND turno IN (1, 2, 3, 4, 5)
+                      AND aluno_id = NEW.aluno_id AND turno <> NEW.turno;
+                    SET v_bit = 1 << (NEW.turno - 1);
+                    WHILE v_mascara <= 31 DO
+                        IF (v_mascara & v_bit) <> 0 AND (v_mascara & v_turnos_anteriores) = 0 THEN
+                            INSERT INTO resumo_turnos (data_entrada, mascara, alunos_unicos)
+                            VALUES (NEW.data_entrada, v_mascara, 1)
+                            ON DUPLICATE KEY UPDATE alunos_unicos = alunos_unicos + 1;
+                        END IF;
+                        SET v_mascara = v_mascara + 1;
+                    END WHILE;
+                END IF;
+            END IF;
+        END""",
+    ]),
+    (10, 'Remove a procedure registrar_entrada_ou_saida', [
+        # Os registros são gravados por db_utils.gravar_registros a partir do diário local
+        'DROP PROCEDURE IF EXISTS registrar_entrada_ou_saida',
+    ]),
+]
+
+# Tabelas que precisam ser lidas por índice nas consultas verificadas
+TABELAS_VERIFICADAS = ('registros_refeitorio', 'r', 'resumo_refeicoes', 'resumo_alunos', 'resumo_turnos')
+# Tipos de acesso do EXPLAIN aceitos: busca pelo índice. 'index' (varredura do
+# índice inteiro) e 'ALL' (da tabela) leem todas as linhas e contam como falha
+TIPOS_ACESSO_INDICE = ('const', 'eq_ref', 'ref', 'range')
+
+def versao_atual(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_versao (
+            versao INT PRIMARY KEY,
+            descricao VARCHAR(255) NOT NULL,
+            aplicada_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+    cursor.execute('SELECT COALESCE(MAX(versao), 0) FROM schema_versao')
+    return cursor.fetchone()[0]
+
+def aplicar_migracoes():
+    """Aplica as migrações pendentes e retorna a versão final do schema."""
+    conn = conectar_db()
+    try:
+        cursor = conn.cursor()
+        versao = versao_atual(cursor)
+        pendentes = [m for m in MIGRACOES if m[0] > versao]
+        if not pendentes:
+            print(f'Schema já está na versão {versao}')
+            return versao
+
+        for numero, descricao, comandos in pendentes:
+            print(f'Aplicando migração {numero}: {descricao}')
+            # DDL faz commit implícito no MariaDB; por isso os comandos são
+            # idempotentes (IF NOT EXISTS / OR REPLACE) e uma migração
+            # interrompida pode simplesmente ser executada de novo.
+            for comando in comandos:
+                if callable(comando):
+                    comando(conn, cursor)
+                else:
+                    cursor.execute(comando)
+            cursor.execute('INSERT INTO schema_versao (versao, descricao) VALUES (?, ?)', (numero, descricao))
+            conn.commit()
+            versao = numero
+
+        cursor.close()
+        print(f'Schema atualizado para a versão {versao}')
+        return versao
+    finally:
+        conn.close()
+
+def consultas_verificadas():
+    """(nome, query, params) de cada consulta quente, com parâmetros de exemplo."""
+    hoje = datetime.date.today()
+    inicio = datetime.datetime.combine(hoje, datetime.time())
+    fim = inicio + datetime.timedelta(days=1)
+    inicio_semana = inicio - datetime.timedelta(days=hoje.weekday())
+    turnos = list(TURNOS)[:2]
+
+    consultas = [
+        ('saída (entrada aberta do aluno)', SQL_GRAVAR_SAIDA, [inicio, None, '', 1, inicio]),
+        ('entradas abertas', SQL_LISTAR_ENTRADAS_ABERTAS, []),
+        ('entradas por turno', *consulta_entradas_por_turno(inicio, fim)),
+        ('entradas por turno (semana)', *consulta_entradas_por_turno(inicio_semana, inicio_semana + datetime.timedelta(days=7))),
+        ('frequência por dia', *consulta_frequencia_por_dia(inicio_semana, inicio_semana + datetime.timedelta(days=7))),
+        ('frequência por dia (um turno)', *consulta_frequencia_por_dia(inicio_semana, inicio_semana + datetime.timedelta(days=7), turnos[:1])),
+        ('frequência por dia (turnos)', *consulta_frequencia_por_dia(inicio_semana, inicio_semana + datetime.timedelta(days=7), turnos)),
+        ('frequência por hora', *consulta_frequencia_por_hora(inicio, fim)),
+        ('relatório diário', *consulta_relatorio_diario(hoje)),
+        ('relatório diário (turnos)', *consulta_relatorio_diario(hoje, turnos)),
+    ]
+    for i, (query, params) in enumerate(consultas_estatisticas_gerais()):
+        consultas.append((f'estatísticas gerais #{i + 1}', query, params))
+    return consultas
+
+def verificar_indices():
+    """Roda EXPLAIN nas consultas quentes e retorna as que leem registros_refeitorio sem índice.
+
+    Num banco quase vazio o otimizador pode preferir varrer a tabela mesmo
+    com o índice disponível, então a verificação só é conclusiva com uma
+    quantidade representativa de registros.
+    """
+    conn = conectar_db()
+    falhas = []
+    try:
+        cursor = conn.cursor()
+        for nome, query, params in consultas_verificadas():
+            cursor.execute('EXPLAIN ' + query, params)
+            columns = [desc[0] for desc in cursor.description]
+            linhas = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            for linha in linhas:
+                if linha['table'] not in TABELAS_VERIFICADAS:
+                    continue
+                ok = linha['type'] in TIPOS_ACESSO_INDICE and linha['key'] is not None
+                print(f"{'OK   ' if ok else 'FALHA'} {nome:<32} tipo={linha['type']} índice={linha['key']} linhas={linha['rows']}")
+                if not ok:
+                    falhas.append(nome)
+        cursor.close()
+    finally:
+        conn.close()
+    return falhas
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Atualiza o schema do banco do refeitório.")
+    parser.add_argument('--verificar', action='store_true',
+                        help="Depois de migrar, confere com EXPLAIN se as consultas usam índice")
+    parser.add_argument('--reconstruir-resumo', action='store_true',
+                        help="Depois de migrar, refaz o resumo de refeições a partir dos registros")
+    args = parser.parse_args()
+
+    modo_script()
+    try:
+        aplicar_migracoes()
+        if args.reconstruir_resumo:
+            reconstruir_resumo()
+        if args.verificar:
+            falhas = verificar_indices()
+            if falhas:
+                print(f'\n{len(falhas)} consulta(s) sem índice: {", ".join(falhas)}')
+                sys.exit(1)
+            print('\nTodas as consultas usam índice')
+    except Exception as e:
+        print(f'Erro ao migrar o banco: {e}')
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,51 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class PortaoMovimento:
+    """Libera os estágios caros só quando há alguém (ou algo mudando) diante da câmera.
+
+    Compara uma cópia minúscula do frame em tons de cinza com um modelo de
+    fundo que se adapta devagar. Enquanto a cena difere do fundo, ou até
+    `tempo_ativo` segundos depois da última diferença, o portão fica aberto.
+    Com a cena parada, ainda libera um frame a cada `intervalo_keepalive`
+    segundos para que nada fique sem leitura indefinidamente.
+    """
+
+    def __init__(self, escala=0.1, limiar_pixel=25, fracao_minima=0.01, adaptacao_fundo=0.005,
+                 tempo_ativo=2.0, intervalo_keepalive=2.0):
+        self.escala = escala
+        self.limiar_pixel = limiar_pixel
+        self.fracao_minima = fracao_minima
+        self.adaptacao_fundo = adaptacao_fundo
+        self.tempo_ativo = tempo_ativo
+        self.intervalo_keepalive = intervalo_keepalive
+        self._fundo = None
+        self._ultima_mudanca = 0.0
+        self._ultimo_keepalive = 0.0
+
+    def cena_mudou(self, contexto):
+        """Atualiza o modelo de fundo e indica se o frame difere dele."""
+        mini = cv2.GaussianBlur(contexto.gray_reduzido(self.escala), (3, 3), 0)
+        if self._fundo is None or self._fundo.shape != mini.shape:
+            self._fundo = mini.astype(np.float32)
+            return True
+
+        diferenca = cv2.absdiff(mini, cv2.convertScaleAbs(self._fundo))
+        fracao = np.count_nonzero(diferenca > self.limiar_pixel) / diferenca.size
+        cv2.accumulateWeighted(mini, self._fundo, self.adaptacao_fundo)
+        return fracao >= self.fracao_minima
+
+    def deve_processar(self, contexto, agora=None):
+        """Retorna True se os estágios caros devem rodar neste frame."""
+        agora = time.monotonic() if agora is None else agora
+        if self.cena_mudou(contexto):
+            self._ultima_mudanca = agora
+        if agora - self._ultima_mudanca < self.tempo_ativo:
+            return True
+        if agora - self._ultimo_keepalive >= self.intervalo_keepalive:
+            self._ultimo_keepalive = agora
+            return True
+        return False
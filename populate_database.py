@@ -1,7 +1,7 @@
 import mariadb
 import datetime
 import random
-from db_utils import conectar_db
+from db_utils import conectar_db, hash_foto, modo_script
 
 def adicionar_alunos_exemplo():
     """Adiciona alunos de exemplo ao banco de dados."""
@@ -82,6 +82,11 @@ def simular_entradas_refeitorio():
         
         registros_adicionados = 0
         
+        # Simular foto (conteúdo fixo, guardado uma vez só em fotos_refeitorio)
+        foto_simulada = b'foto_simulada'
+        foto_hash = hash_foto(foto_simulada)
+        cursor.execute('INSERT IGNORE INTO fotos_refeitorio (hash, dados) VALUES (?, ?)', (foto_hash, foto_simulada))
+        
         for data in datas:
             print(f"\nSimulando entradas para {data.strftime('%d/%m/%Y')}:")
             
@@ -110,14 +115,11 @@ def simular_entradas_refeitorio():
                     tempo_refeicao = random.randint(30, 120)  # minutos
                     saida = entrada + datetime.timedelta(minutes=tempo_refeicao)
                     
-                    # Simular foto (BLOB vazio para simulação)
-                    foto_simulada = b'foto_simulada'
-                    
                     try:
                         cursor.execute('''
-                            INSERT INTO registros_refeitorio (aluno_id, foto, hora_entrada, hora_saida) 
+                            INSERT INTO registros_refeitorio (aluno_id, foto_hash, hora_entrada, hora_saida) 
                             VALUES (?, ?, ?, ?)
-                        ''', (aluno_id, foto_simulada, entrada, saida))
+                        ''', (aluno_id, foto_hash, entrada, saida))
                         registros_adicionados += 1
                         
                     except mariadb.IntegrityError as e:
@@ -199,6 +201,7 @@ def mostrar_estatisticas():
 
 if __name__ == "__main__":
     print("=== POPULANDO BANCO DE DADOS ===")
+    modo_script()
     
     # 1. Adicionar alunos
     print("\n1. Adicionando alunos...")
@@ -0,0 +1,56 @@
+import cv2
+import numpy as np
+from PyQt5.QtCore import QEvent, QObject
+from PyQt5.QtGui import QImage, QPixmap
+
+
+class RenderizadorPreview(QObject):
+    """Exibe frames BGR do OpenCV num QLabel com o menor custo possível por frame.
+
+    O frame é redimensionado uma única vez, no OpenCV, direto para o tamanho
+    final e embrulhado num QImage no formato BGR888, sem conversão de cor. O
+    tamanho de destino fica em cache até o QLabel ser redimensionado, e frames
+    já exibidos (mesmo número) não são redesenhados.
+    """
+
+    def __init__(self, label, parent=None):
+        super().__init__(parent)
+        self.label = label
+        self._tamanho_origem = None
+        self._tamanho_destino = None
+        self._ultimo_numero = None
+        self._buffer = None
+        label.installEventFilter(self)
+
+    def eventFilter(self, objeto, evento):
+        if objeto is self.label and evento.type() == QEvent.Resize:
+            self._tamanho_destino = None
+        return False
+
+    def exibir(self, frame, numero=None):
+        """Exibe o frame no QLabel. `numero` identifica o frame para evitar redesenhos repetidos."""
+        if numero is not None and numero == self._ultimo_numero:
+            return
+        self._ultimo_numero = numero
+
+        altura, largura = frame.shape[:2]
+        if self._tamanho_destino is None or self._tamanho_origem != (largura, altura):
+            self._tamanho_origem = (largura, altura)
+            self._tamanho_destino = self._calcular_tamanho(largura, altura)
+
+        destino_w, destino_h = self._tamanho_destino
+        if (destino_w, destino_h) != (largura, altura):
+            frame = cv2.resize(frame, (destino_w, destino_h), interpolation=cv2.INTER_LINEAR)
+        frame = np.ascontiguousarray(frame)
+
+        # Mantém a referência ao buffer enquanto o QImage aponta para ele
+        self._buffer = frame
+        qt_image = QImage(frame.data, destino_w, destino_h, frame.strides[0], QImage.Format_BGR888)
+        self.label.setPixmap(QPixmap.fromImage(qt_image))
+
+    def _calcular_tamanho(self, largura, altura):
+        # Mesmo resultado de Qt.KeepAspectRatio: cabe inteiro no QLabel
+        escala = min(self.label.width() / largura, self.label.height() / altura)
+        if escala <= 0:
+            return largura, altura
+        return max(1, int(largura * escala)), max(1, int(altura * escala))
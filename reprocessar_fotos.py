@@ -0,0 +1,103 @@
+import argparse
+
+import cv2
+import numpy as np
+
+from db_utils import SQL_GRAVAR_FOTO, conectar_db, hash_foto, modo_script
+from fotos import (CODEC_FOTO, CODECS, QUALIDADE_FOTO, TAMANHO_FOTO, codificar_foto, gerar_miniatura,
+                   normalizar_foto)
+
+# Fotos lidas e regravadas por transação
+TAMANHO_LOTE = 200
+
+def reprocessar_fotos(codec=CODEC_FOTO, qualidade=QUALIDADE_FOTO, tamanho_lote=TAMANHO_LOTE,
+                      simular=False, otimizar=False):
+    """Regrava as fotos existentes no formato canônico (fotos.py).
+
+    Percorre, em ordem de hash e em lotes confirmados um a um, as fotos que
+    existiam no início (uma cópia dos hashes numa tabela temporária), então
+    as fotos regravadas não são visitadas de novo. Pode ser interrompido e
+    executado de novo: fotos que já estão na resolução canônica são mantidas. Fotos que não decodificam também são
+    mantidas e contadas. Como as fotos são endereçadas pelo conteúdo, a foto
+    regravada ganha um hash novo: os registros passam a apontar para ele e a
+    antiga é apagada. A foto regravada já ganha a miniatura. Com `simular`,
+    só calcula a economia.
+    """
+    conn = conectar_db()
+    cursor = conn.cursor()
+    ultimo_hash = ''
+    totais = {'lidas': 0, 'regravadas': 0, 'mantidas': 0, 'invalidas': 0, 'bytes_antes': 0, 'bytes_depois': 0}
+    try:
+        cursor.execute("""
+            CREATE TEMPORARY TABLE fotos_a_reprocessar (hash CHAR(64) PRIMARY KEY)
+            SELECT hash FROM fotos_refeitorio
+            """)
+        while True:
+            cursor.execute("""
+                SELECT f.hash, f.dados FROM fotos_a_reprocessar a
+                JOIN fotos_refeitorio f ON f.hash = a.hash
+                WHERE a.hash > ?
+                ORDER BY a.hash LIMIT ?
+                """, (ultimo_hash, tamanho_lote))
+            linhas = cursor.fetchall()
+            if not linhas:
+                break
+            ultimo_hash = linhas[-1][0]
+
+            atualizacoes = []
+            for hash_antigo, foto in linhas:
+                totais['lidas'] += 1
+                totais['bytes_antes'] += len(foto)
+                imagem = cv2.imdecode(np.frombuffer(foto, np.uint8), cv2.IMREAD_COLOR)
+                if imagem is None:
+                    totais['invalidas'] += 1
+                    totais['bytes_depois'] += len(foto)
+                    continue
+                if imagem.shape[1::-1] == TAMANHO_FOTO:
+                    totais['mantidas'] += 1
+                    totais['bytes_depois'] += len(foto)
+                    continue
+                nova = codificar_foto(normalizar_foto(imagem), codec, qualidade)
+                totais['regravadas'] += 1
+                totais['bytes_depois'] += len(nova)
+                atualizacoes.append((hash_antigo, hash_foto(nova), nova))
+
+            if atualizacoes and not simular:
+                cursor.executemany(SQL_GRAVAR_FOTO, [(novo, dados, gerar_miniatura(dados))
+                                                     for _, novo, dados in atualizacoes])
+                cursor.executemany('UPDATE registros_refeitorio SET foto_hash = ? WHERE foto_hash = ?',
+                                   [(novo, antigo) for antigo, novo, _ in atualizacoes])
+                cursor.executemany('DELETE FROM fotos_refeitorio WHERE hash = ?',
+                                   [(antigo,) for antigo, novo, _ in atualizacoes if antigo != novo])
+                conn.commit()
+            print(f"{totais['lidas']} fotos lidas, {totais['regravadas']} regravadas")
+
+        if otimizar and not simular:
+            # Devolve ao sistema de arquivos o espaço liberado pelas fotos menores
+            print('Otimizando a tabela fotos_refeitorio...')
+            cursor.execute('OPTIMIZE TABLE fotos_refeitorio')
+            cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+    economia = totais['bytes_antes'] - totais['bytes_depois']
+    print(f"\n=== REPROCESSAMENTO DE FOTOS{' (simulação)' if simular else ''} ===")
+    print(f"Fotos lidas: {totais['lidas']}")
+    print(f"Regravadas: {totais['regravadas']} | Já no formato: {totais['mantidas']} | Inválidas: {totais['invalidas']}")
+    print(f"Tamanho: {totais['bytes_antes'] / 1e6:.1f} MB -> {totais['bytes_depois'] / 1e6:.1f} MB "
+          f"(economia de {economia / 1e6:.1f} MB)")
+    return totais
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regrava as fotos existentes no formato canônico.")
+    parser.add_argument('--codec', default=CODEC_FOTO, choices=list(CODECS), help="Formato das fotos regravadas")
+    parser.add_argument('--qualidade', type=int, default=QUALIDADE_FOTO, help="Qualidade de 0 a 100")
+    parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help="Registros por transação")
+    parser.add_argument('--simular', action='store_true', help="Só calcula a economia, sem gravar")
+    parser.add_argument('--otimizar', action='store_true',
+                        help="Ao final, roda OPTIMIZE TABLE para liberar o espaço em disco")
+    args = parser.parse_args()
+
+    modo_script()
+    reprocessar_fotos(args.codec, args.qualidade, args.lote, args.simular, args.otimizar)
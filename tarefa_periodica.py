@@ -0,0 +1,44 @@
+import threading
+import traceback
+
+# Espera máxima (segundos) pela execução em andamento ao parar: cobre o
+# connect_timeout do banco e a espera por uma conexão do pool
+ESPERA_PARADA = 15.0
+
+
+class TarefaPeriodica:
+    """Chama `funcao` numa thread própria a cada `intervalo` segundos, até parar().
+
+    Usada pelas sincronizações com o banco que rodam em segundo plano (cache
+    do cadastro, entradas abertas, estatísticas). Um erro numa execução é
+    mostrado no log e não interrompe as próximas.
+    """
+
+    def __init__(self, funcao, intervalo, nome, descricao):
+        self.funcao = funcao
+        self.intervalo = intervalo
+        self.nome = nome
+        # Completa a mensagem de erro: 'Erro ao {descricao}: ...'
+        self.descricao = descricao
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name=self.nome, daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.funcao()
+            except Exception as e:
+                print(f'Erro ao {self.descricao}: {e}')
+                traceback.print_exc()
+
+    def parar(self, timeout=ESPERA_PARADA):
+        """Interrompe o ciclo e espera a execução em andamento terminar (até `timeout` segundos)."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)